@@ -0,0 +1,195 @@
+""" Computer player: Monte Carlo placement
+
+    Candidate placements are scored by rollouts: the rest of the round is played from current game state with
+    candidate placed (players placing after this one get random cells), score is player's population at round end.
+    Candidate with best mean score is placed. Rollouts run in process pool under time budget, so more cores give
+    more rollouts per move. Base grid is put to shared memory once per move: workers only read it and copy it to
+    their own array for every rollout, instead of game being pickled or lists of rows being deep-copied.
+"""
+
+import logging
+import multiprocessing
+import random
+import time
+import weakref
+from collections import deque
+from multiprocessing import shared_memory
+try:
+    from . import engines, patterns
+    from .logic import GameOfLife, GameSettings
+except ImportError:
+    import engines
+    import patterns
+    from logic import GameOfLife, GameSettings
+np = engines.np
+
+
+class MonteCarloPolicy:
+    name = 'montecarlo'
+
+    """
+        budget: seconds per placement, workers: processes for rollouts (0 = rollouts in this process),
+        candidates: placements compared, rollouts: limit of rollouts per placement (None = until budget is spent)
+    """
+    def __init__(self, budget: float=0.5, workers: int=0, candidates: int=16, rollouts: int=None,
+                patterns_share: float=0.5, spread: float=2.5):
+        if np is None:
+            raise ImportError('Monte Carlo player requires numpy to be installed')
+        self.budget = budget
+        self.workers = workers
+        self.candidates = candidates
+        self.rollouts = rollouts
+        self.patterns_share = patterns_share
+        self.spread = spread
+        self.pool = None
+        self.shm = None
+        self.release = None
+        # Rollouts made for last placement
+        self.played = 0
+
+    """ Add up to count cells for player (same interface as batch policies), returns number of added cells """
+    def Place(self, game: GameOfLife, player: int, count: int, rnd: random.Random) -> int:
+        deadline = time.perf_counter() + self.budget
+        base = self.__share(game)
+        candidates = [self.__candidate(base, count, rnd) for c in range(self.candidates)]
+        state = (self.shm.name if self.workers > 0 else base, base.shape, self.__config(game, player))
+        scores = [[] for c in candidates]
+        pending = deque()
+        submitted = 0
+        while True:
+            """ Every candidate gets at least one rollout, others are made while time is left """
+            while len(pending) < max(1, 2 * self.workers) and (submitted < len(candidates) or
+                    (time.perf_counter() < deadline and (self.rollouts is None or submitted < self.rollouts))):
+                c = submitted % len(candidates)
+                args = (state, candidates[c], rnd.getrandbits(32))
+                pending.append((c, self.pool.apply_async(_rollout, args) if self.workers > 0 else _rollout(*args)))
+                submitted += 1
+            if not pending:
+                break
+            c, result = pending.popleft()
+            scores[c].append(result.get() if self.workers > 0 else result)
+        self.played = submitted
+        best = max(range(len(candidates)), key=lambda c: sum(scores[c]) / len(scores[c]))
+        added = 0
+        for x, y in candidates[best]:
+            added += game.AddCell(player, x, y)
+        return added
+
+    """ Stop workers and free shared memory """
+    def Close(self):
+        if self.release is not None:
+            self.release()
+            self.release = None
+        self.pool = None
+        self.shm = None
+
+    """ Current grid as array (in shared memory when there are workers) """
+    def __share(self, game: GameOfLife):
+        grid = game.grid
+        if not isinstance(grid, np.ndarray):
+            grid = np.array([list(row) for row in grid], dtype=np.uint8).reshape(game.rows, game.cols)
+        if self.workers == 0:
+            return grid.copy()
+        if self.shm is None or self.shm.size < grid.size:
+            self.Close()
+            self.shm = shared_memory.SharedMemory(create=True, size=max(1, grid.size))
+            self.pool = multiprocessing.Pool(self.workers)
+            self.release = weakref.finalize(self, _releasePolicy, self.pool, self.shm)
+        base = np.ndarray(grid.shape, dtype=np.uint8, buffer=self.shm.buf)
+        base[:] = grid
+        return base
+
+    """ What rollouts need to know about game, besides grid """
+    def __config(self, game: GameOfLife, player: int) -> tuple:
+        settings = game.settings
+        queue = list(game.players_queue)
+        later = queue[queue.index(player) + 1:] if player in queue else []
+        return (settings.players_number, settings.generations_per_round, settings.rules, settings.simultaneous,
+                getattr(game.engine, 'wrap', True), tuple(queue), player, tuple(later), settings.new_cells_per_round)
+
+    """ Free cells for placement: clustered single cells, or library patterns stamped around one random point """
+    def __candidate(self, base, count: int, rnd: random.Random) -> list:
+        rows, cols = base.shape
+        cx, cy = rnd.randrange(cols), rnd.randrange(rows)
+        chosen = {}
+        stamps = rnd.random() < self.patterns_share
+        for attempt in range(count * 10):
+            if len(chosen) >= count:
+                break
+            x = int(round(rnd.gauss(cx, self.spread)))
+            y = int(round(rnd.gauss(cy, self.spread)))
+            if stamps:
+                pattern = rnd.choice(rnd.choice(_PATTERNS).Variants())
+                cells = [(x + dx, y + dy) for dx, dy in pattern.cells]
+            else:
+                cells = [(x, y)]
+            for cell in cells:
+                cell = (cell[0] % cols, cell[1] % rows)
+                if len(chosen) < count and base[cell[1], cell[0]] == 0:
+                    chosen[cell] = True
+        return list(chosen)
+
+
+""" Patterns stamped by candidates """
+_PATTERNS = [patterns.PATTERNS[name] for name in ('glider', 'r-pentomino', 'block', 'blinker', 'acorn')]
+
+
+""" Rollout games never log: there are thousands of them """
+_rollout_logger = logging.getLogger('GameOfLife.rollouts')
+_rollout_logger.propagate = False
+_rollout_logger.setLevel('WARNING')
+
+""" Per process: shared memory attached by name, rollout game by size and settings """
+_shared = {}
+_games = {}
+
+
+""" Player's population at round end after placing cells (worker part of MonteCarloPolicy.Place) """
+def _rollout(state: tuple, cells: list, seed: int) -> int:
+    base, shape, config = state
+    players, generations, rules, simultaneous, wrap, queue, player, later, count = config
+    if isinstance(base, str):
+        if base not in _shared:
+            _shared[base] = shared_memory.SharedMemory(name=base)
+        base = np.ndarray(shape, dtype=np.uint8, buffer=_shared[base].buf)
+    game = _rolloutGame(shape, config)
+    # Engine keeps its own copy: shared base is only read
+    game.grid = base
+    game.players_queue = list(queue)
+    game.cur_round = 1
+    game.cur_round_generation = 1
+    for x, y in cells:
+        game.AddCell(player, x, y)
+    rnd = random.Random(seed)
+    rows, cols = shape
+    for p in later:
+        added = 0
+        for attempt in range(count * 10):
+            if added == count:
+                break
+            added += game.AddCell(p, rnd.randrange(cols), rnd.randrange(rows))
+    while True:
+        game.Move()
+        if game.cur_round_generation == 1:
+            return game.Populations[player]
+
+
+""" Game playing rollouts: one per process for each size and settings, reused """
+def _rolloutGame(shape: tuple, config: tuple) -> GameOfLife:
+    players, generations, rules, simultaneous, wrap = config[:5]
+    key = (shape, players, generations, rules, simultaneous, wrap)
+    game = _games.get(key)
+    if game is None:
+        settings = GameSettings(players_number=players, generations_per_round=generations, rounds_number=1,
+                                rules=rules, simultaneous=simultaneous)
+        game = GameOfLife(size=(shape[1], shape[0]), settings=settings, engine='numpy' if wrap else 'plane',
+                          cycles=True)
+        game.logger = _rollout_logger
+        _games[key] = game
+    return game
+
+
+def _releasePolicy(pool, shm):
+    pool.terminate()
+    shm.close()
+    shm.unlink()
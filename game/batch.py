@@ -0,0 +1,189 @@
+""" Headless batch runner: many games with automated cell placement, results streamed as JSON lines
+
+    Usage: python -m game.batch --games 1000 --processes 8 --policy random clustered --out results.jsonl
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from . import ai, patterns
+from .logic import GameSettings, GameOfLife
+
+
+""" Placement policy: random empty cells all over the grid """
+class RandomPolicy:
+    name = 'random'
+
+    """ Add up to count cells for player, returns number of added cells """
+    def Place(self, game: GameOfLife, player: int, count: int, rnd: random.Random) -> int:
+        added = 0
+        # Attempts are limited, grid can be almost full
+        for attempt in range(count * 10):
+            if added == count:
+                break
+            added += game.AddCell(player, rnd.randrange(game.cols), rnd.randrange(game.rows))
+        return added
+
+
+""" Placement policy: cells gathered around one random point """
+class ClusteredPolicy:
+    name = 'clustered'
+
+    def __init__(self, spread: float=2.5):
+        self.spread = spread
+
+    def Place(self, game: GameOfLife, player: int, count: int, rnd: random.Random) -> int:
+        cx, cy = rnd.randrange(game.cols), rnd.randrange(game.rows)
+        added = 0
+        for attempt in range(count * 10):
+            if added == count:
+                break
+            x = int(round(rnd.gauss(cx, self.spread))) % game.cols
+            y = int(round(rnd.gauss(cy, self.spread))) % game.rows
+            added += game.AddCell(player, x, y)
+        return added
+
+
+""" Placement policy: library patterns stamped in random orientation at random points """
+class PatternPolicy:
+    name = 'pattern'
+
+    def __init__(self, names=('glider', 'r-pentomino', 'block', 'blinker')):
+        self.patterns = [patterns.PATTERNS[name] for name in names]
+
+    def Place(self, game: GameOfLife, player: int, count: int, rnd: random.Random) -> int:
+        added = 0
+        for attempt in range(count * 2):
+            if added == count:
+                break
+            pattern = rnd.choice(rnd.choice(self.patterns).Variants())
+            added += game.AddPattern(player, pattern, rnd.randrange(game.cols), rnd.randrange(game.rows), count - added)
+        return added
+
+
+""" Policies selectable by name """
+POLICIES = {policy.name: policy for policy in (RandomPolicy, ClusteredPolicy, PatternPolicy, ai.MonteCarloPolicy)}
+
+
+"""
+    Play one game headless, returns its result record.
+    Config is a dict with: size, players, rounds, generations, cells, policies, engine, cycles, rules, simultaneous,
+    ai_budget and ai_workers (seconds per placement and rollout processes of montecarlo policy)
+"""
+def PlayGame(config: dict, game_number: int, seed: int) -> dict:
+    started = time.perf_counter()
+    rnd = random.Random(seed)
+    settings = GameSettings(players_number=config['players'],
+                            generations_per_round=config['generations'],
+                            rounds_number=config['rounds'],
+                            new_cells_per_round=config['cells'],
+                            rules=config.get('rules', 'B3/S23'),
+                            simultaneous=config.get('simultaneous', False))
+    # Game's own generator shuffles players queue, its seed comes from game's seed too
+    game = GameOfLife(size=tuple(config['size']), settings=settings, engine=config.get('engine', 'python'),
+                      cycles=config.get('cycles', True), seed=rnd.getrandbits(32))
+    names = config['policies']
+    policies = {p: _makePolicy(names[(p - 1) % len(names)], config) for p in range(1, settings.players_number + 1)}
+    game.Start()
+    rounds = []
+    while not game.IsOver:
+        if game.cur_round_generation == 1:
+            for p in game.players_queue:
+                policies[p].Place(game, p, settings.new_cells_per_round, rnd)
+        game.Move()
+        """ Round ended """
+        if game.cur_round_generation == 1:
+            rounds.append(game.Populations[1:])
+    for policy in policies.values():
+        if hasattr(policy, 'Close'):
+            policy.Close()
+    return {
+        'game': game_number,
+        'seed': seed,
+        'policies': [policies[p].name for p in sorted(policies)],
+        'winner': game.Winner,
+        'rounds': rounds,
+        'wall_time': time.perf_counter() - started,
+    }
+
+
+def _makePolicy(name: str, config: dict):
+    if name == ai.MonteCarloPolicy.name:
+        return ai.MonteCarloPolicy(budget=config.get('ai_budget', 0.5), workers=config.get('ai_workers', 0))
+    return POLICIES[name]()
+
+
+def _playGameArgs(args):
+    return PlayGame(*args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m game.batch', description='Run headless Game of Life tournaments')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument('--size', default='32x24', help='grid size as COLSxROWS')
+    parser.add_argument('--players', type=int, default=2)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--generations', type=int, default=10)
+    parser.add_argument('--cells', type=int, default=20)
+    parser.add_argument('--policy', nargs='+', default=['random'], choices=sorted(POLICIES),
+                        help='placement policy per player (cycled if fewer than players)')
+    parser.add_argument('--engine', default='python')
+    parser.add_argument('--rules', default='B3/S23', help="B/S rulestring, or one per player separated by ';'")
+    parser.add_argument('--simultaneous', action='store_true', help='all players step at once from the same grid')
+    parser.add_argument('--ai-budget', type=float, default=0.5, help='seconds per placement of montecarlo policy')
+    parser.add_argument('--ai-workers', type=int, default=0,
+                        help='rollout processes of montecarlo policy (needs --processes 1, 0 = rollouts in game process)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-cycles', dest='cycles', action='store_false',
+                        help='play every generation even when grid repeats within round')
+    parser.add_argument('--out', default='-', help='JSONL output file, - for stdout')
+    args = parser.parse_args(argv)
+    if args.ai_workers > 0 and args.processes != 1:
+        parser.error('--ai-workers needs --processes 1: games in process pool can not start rollout processes')
+
+    cols, rows = (int(v) for v in args.size.lower().split('x'))
+    config = {
+        'size': (cols, rows),
+        'players': args.players,
+        'rounds': args.rounds,
+        'generations': args.generations,
+        'cells': args.cells,
+        'policies': args.policy,
+        'engine': args.engine,
+        'cycles': args.cycles,
+        'rules': args.rules,
+        'simultaneous': args.simultaneous,
+        'ai_budget': args.ai_budget,
+        'ai_workers': args.ai_workers,
+    }
+    # GameOfLife writes to logs/game.log
+    os.makedirs('logs', exist_ok=True)
+    jobs = ((config, n, args.seed + n) for n in range(args.games))
+    out = sys.stdout if args.out == '-' else open(args.out, 'a')
+    started = time.perf_counter()
+    """ With one process games are played here: their policies may start processes of their own (pool workers can not) """
+    pool = multiprocessing.Pool(args.processes) if args.processes != 1 else None
+    try:
+        if pool is None:
+            results = map(_playGameArgs, jobs)
+        else:
+            results = pool.imap_unordered(_playGameArgs, jobs, chunksize=max(1, args.games // (args.processes * 8)))
+        for result in results:
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+    finally:
+        if pool is not None:
+            pool.terminate()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - started
+    print('{} games in {:.2f}s ({:.1f} games/s)'.format(args.games, elapsed, args.games / elapsed), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+""" Benchmark suite for game logic with regression tracking
+
+    Usage: python -m game.bench --sizes 30x20 512x512 --players 2 5 --out results.json --baseline baseline.json
+    Each case runs up to --generations generations, but no longer than --max-seconds (at least one generation).
+    As with timeit, every metric is timed --repeats times (each at least --min-seconds, small steps are run many times
+    in a row) and the best one is kept: it is the least disturbed by the rest of the system.
+    Exit code is 1 if any metric is slower than baseline by more than --threshold.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+from . import engines
+from .logic import GameSettings, GameOfLife
+
+
+""" Glider cells (dx, dy) """
+GLIDER = ((1,0), (2,1), (0,2), (1,2), (2,2))
+
+
+""" Starting grid of given density profile, cells are spread between players """
+def MakeGrid(profile: str, size: (int, int), players: int, seed: int=0) -> list:
+    cols, rows = size
+    rnd = random.Random(seed)
+    grid = [[0] * cols for y in range(rows)]
+    if profile == 'soup':
+        for y in range(rows):
+            for x in range(cols):
+                if rnd.random() < 0.3:
+                    grid[y][x] = rnd.randint(1, players)
+    elif profile == 'gliders':
+        n = 0
+        for y in range(0, rows - 2, 8):
+            for x in range(0, cols - 2, 8):
+                n += 1
+                for dx, dy in GLIDER:
+                    grid[y + dy][x + dx] = n % players + 1
+    elif profile == 'blocks':
+        n = 0
+        for y in range(0, rows - 1, 4):
+            for x in range(0, cols - 1, 4):
+                n += 1
+                for dx, dy in ((0,0), (1,0), (0,1), (1,1)):
+                    grid[y + dy][x + dx] = n % players + 1
+    else:
+        raise ValueError('Unknown profile: {}'.format(profile))
+    return grid
+
+
+"""
+    Best rate of repeats: setup (not timed) and run (returns number of operations) alternate for at least min_seconds.
+    Garbage collector is off while timing, as in timeit
+"""
+def BestRate(setup, run, repeats: int=5, min_seconds: float=0.1) -> float:
+    best = 0
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        for r in range(repeats):
+            done = elapsed = 0
+            while elapsed < min_seconds or done == 0:
+                setup()
+                started = time.perf_counter()
+                done += run()
+                elapsed += time.perf_counter() - started
+            best = max(best, done / elapsed)
+    finally:
+        if collecting:
+            gc.enable()
+    return best
+
+
+""" Run benchmark case, returns metrics (throughput, bigger is better) """
+def RunCase(engine: str, size: (int, int), players: int, profile: str,
+            generations: int=20, max_seconds: float=2, repeats: int=5, min_seconds: float=0.1) -> dict:
+    cols, rows = size
+    cells = cols * rows
+    options = {'workers': os.cpu_count()} if engine == 'striped' else {'engine': engine}
+    settings = GameSettings(players_number=players, generations_per_round=50, rounds_number=30)
+    game = GameOfLife(size=size, settings=settings, seed=0, **options)
+    game.Start()
+    """ Every timing starts from the same state (game would be over after enough moves) """
+    empty = game.Snapshot()
+    game.grid = MakeGrid(profile, size, players)
+    start = game.Snapshot()
+
+    """ AddCell: fill empty grid in random order """
+    rnd = random.Random(1)
+    targets = [(rnd.randrange(cols), rnd.randrange(rows)) for i in range(min(cells, 100000))]
+    def addCells():
+        for i, (x, y) in enumerate(targets):
+            game.AddCell(i % players + 1, x, y)
+        return len(targets)
+    add_cell = BestRate(lambda: game.Restore(empty), addCells, repeats, min_seconds)
+
+    """ Move: whole generations from starting grid """
+    def moves():
+        done = 0
+        started = time.perf_counter()
+        while done < generations and (done == 0 or time.perf_counter() - started < max_seconds):
+            game.Move()
+            done += 1
+        return done
+    move = BestRate(lambda: game.Restore(start), moves, repeats, min_seconds)
+
+    """ Player move: one player's sub-step on starting grid """
+    def playerMove():
+        game._GameOfLife__playerMove()
+        return 1
+    def startPlayer():
+        game.Restore(start)
+        game.cur_player = game.players_queue[0]
+    player_move = BestRate(startPlayer, playerMove, repeats, min_seconds)
+
+    if engine == 'striped':
+        game.engine.Close()
+    return {
+        'generations_per_second': move,
+        'cells_per_second': move * cells,
+        'player_moves_per_second': player_move,
+        'add_cell_per_second': add_cell,
+    }
+
+
+""" Key identifying benchmark case """
+def CaseKey(result: dict) -> str:
+    return '{engine} {size} p{players} {profile}'.format(**result)
+
+
+""" Metrics slower than baseline by more than threshold: [(case, metric, baseline, current), ...] """
+def Compare(results: list, baseline: list, threshold: float=0.1) -> list:
+    base = {CaseKey(r): r['metrics'] for r in baseline}
+    regressions = []
+    for result in results:
+        key = CaseKey(result)
+        if key not in base:
+            continue
+        for metric, value in result['metrics'].items():
+            old = base[key].get(metric)
+            if old and value < old * (1 - threshold):
+                regressions.append((key, metric, old, value))
+    return regressions
+
+
+def main(argv=None):
+    available = ['python', 'bitboard', 'sparse'] + (['numpy', 'striped'] if engines.np is not None else [])
+    parser = argparse.ArgumentParser(prog='python -m game.bench', description='Benchmark Game of Life logic')
+    parser.add_argument('--engines', nargs='+', default=available, choices=available)
+    parser.add_argument('--sizes', nargs='+', default=['30x20', '128x128', '512x512'],
+                        help='grid sizes as COLSxROWS (e.g. add 2048x2048 for huge boards, python engine takes minutes)')
+    parser.add_argument('--players', nargs='+', type=int, default=[1, 2, 5])
+    parser.add_argument('--profiles', nargs='+', default=['soup', 'gliders', 'blocks'],
+                        choices=['soup', 'gliders', 'blocks'])
+    parser.add_argument('--generations', type=int, default=20)
+    parser.add_argument('--max-seconds', type=float, default=2, help='time limit of Move part of each case')
+    parser.add_argument('--repeats', type=int, default=5, help='timings of each metric, best one is kept')
+    parser.add_argument('--min-seconds', type=float, default=0.1, help='minimal time of each timing')
+    parser.add_argument('--out', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed slowdown against baseline (0.1 = 10%%)')
+    args = parser.parse_args(argv)
+
+    # GameOfLife writes to logs/game.log
+    os.makedirs('logs', exist_ok=True)
+    results = []
+    for engine in args.engines:
+        for size in args.sizes:
+            cols, rows = (int(v) for v in size.lower().split('x'))
+            for players in args.players:
+                for profile in args.profiles:
+                    result = {'engine': engine, 'size': size, 'players': players, 'profile': profile}
+                    result['metrics'] = RunCase(engine, (cols, rows), players, profile, args.generations,
+                                                args.max_seconds, args.repeats, args.min_seconds)
+                    results.append(result)
+                    print('{:<32} {:>10.1f} gen/s {:>14.0f} cells/s'.format(
+                        CaseKey(result), result['metrics']['generations_per_second'], result['metrics']['cells_per_second']))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'results': results,
+            }, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = Compare(results, json.load(f)['results'], args.threshold)
+        for key, metric, old, value in regressions:
+            print('REGRESSION {} {}: {:.1f} -> {:.1f} ({:+.1%})'.format(key, metric, old, value, value / old - 1))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,741 @@
+""" Alternative grid engines for GameOfLife """
+
+import functools
+import multiprocessing
+import weakref
+from collections import Counter
+from multiprocessing import shared_memory
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    from . import rules
+except ImportError:
+    import rules
+
+
+""" Population changes of player's move: its died cells, and births counted by what they replaced (index = old cell value) """
+def _populationChanges(player: int, dies: int, replaced: list) -> dict:
+    changes = {player: sum(replaced) - dies}
+    for p in range(1, len(replaced)):
+        if replaced[p]:
+            changes[p] = -replaced[p]
+    return changes
+
+
+""" Neighbor counts of rule table's births and survivals as ranges (lo, hi), B3/S23 gives ((3, 3),) and ((2, 3),) """
+@functools.lru_cache(maxsize=None)
+def _ruleRanges(rule: tuple) -> tuple:
+    ranges = []
+    for table in (rule[:9], rule[9:]):
+        counts = []
+        for n in range(9):
+            if table[n] and counts and counts[-1][1] == n - 1:
+                counts[-1][1] = n
+            elif table[n]:
+                counts.append([n, n])
+        ranges.append(tuple(tuple(r) for r in counts))
+    return tuple(ranges)
+
+
+""" Array mask of neighbor counts inside ranges: a couple of comparisons per range, cheaper than table gather """
+def _inRanges(neighbors, ranges):
+    mask = np.zeros(neighbors.shape, dtype=bool)
+    for lo, hi in ranges:
+        mask |= (neighbors == lo) if lo == hi else (neighbors >= lo) & (neighbors <= hi)
+    return mask
+
+
+""" Indexes of set bits of number """
+def _bits(n: int):
+    while n:
+        low = n & -n
+        yield low.bit_length() - 1
+        n ^= low
+
+
+""" NumPy engine: grid kept as uint8 array, whole-board neighbor counting """
+class NumpyEngine:
+    __slots__ = ('grid',)
+
+    def __init__(self, size: (int, int)):
+        if np is None:
+            raise ImportError('NumPy engine requires numpy to be installed')
+        cols, rows = size
+        self.grid = np.zeros((rows, cols), dtype=np.uint8)
+
+    """ Replace engine state with given grid (list of rows) """
+    def Load(self, grid):
+        self.grid = np.array(grid, dtype=np.uint8)
+
+    """ Kill all cells """
+    def Clear(self):
+        self.grid[:] = 0
+
+    """ Copy of engine state for Restore """
+    def Snapshot(self):
+        return self.grid.copy()
+
+    """ Go back to state given by Snapshot (it stays usable) """
+    def Restore(self, state):
+        if state.shape == self.grid.shape:
+            self.grid[:] = state
+        else:
+            self.grid = state.copy()
+
+    """
+        Process move of player, same rules as GameOfLife.__getCellNewStatus (rule is rules module table).
+        Returns population changes. Changed cells (x, y, old, new) are added to changes list if given
+    """
+    def Step(self, player: int, changes: list=None, rule: tuple=rules.LIFE) -> dict:
+        accp = self.grid == player
+        neighbors = self.__getACCPNeighborsCount(accp)
+        birth, survival = _ruleRanges(rule)
+        dies = accp & ~_inRanges(neighbors, survival)
+        born = ~accp & _inRanges(neighbors, birth)
+        replaced = np.bincount(self.grid[born], minlength=1)
+        if changes is not None:
+            ys, xs = np.nonzero(dies | born)
+            old = self.grid[ys, xs]
+        self.grid[dies] = 0
+        self.grid[born] = player
+        if changes is not None:
+            changes.extend(zip(xs.tolist(), ys.tolist(), old.tolist(), self.grid[ys, xs].tolist()))
+        return _populationChanges(player, int(np.count_nonzero(dies)), replaced.tolist())
+
+    """
+        Simultaneous move of all players (see rules.Resolve): order gives tiebreak priority of players,
+        tables are rule tables of players (index 0 is not used). Returns population changes
+    """
+    def StepAll(self, order: list, tables: list, changes: list=None) -> dict:
+        return _stepAll(self.grid, order, tables, changes)
+
+    """ Count cells of each player (index 0 is not used) """
+    def Counts(self, players_number: int) -> list:
+        counts = np.bincount(self.grid.ravel(), minlength=players_number + 1).tolist()
+        counts[0] = 0
+        return counts
+
+    """ Toroidal 3x3 box sum of ACCP mask minus the cell itself """
+    def __getACCPNeighborsCount(self, accp):
+        return _neighborsCount(accp)
+
+
+""" Toroidal 3x3 box sum of mask (or stack of masks) minus the cell itself """
+def _neighborsCount(mask):
+    cells = mask.view(np.uint8)
+    column = cells + np.roll(cells, 1, axis=-2) + np.roll(cells, -1, axis=-2)
+    return column + np.roll(column, 1, axis=-1) + np.roll(column, -1, axis=-1) - cells
+
+
+"""
+    Simultaneous move of all players on array grid (changed in place), in one pass:
+    neighbor counts of all players are (players x rows x cols) tensor
+"""
+def _stepAll(grid, order: list, tables: list, changes: list=None) -> dict:
+    players = len(tables) - 1
+    owned = grid[None] == np.arange(1, players + 1, dtype=np.uint8)[:, None, None]
+    neighbors = _neighborsCount(owned)
+    """
+        Birth key: neighbors count, priority (first in order is highest), player (0 = no birth).
+        Running maximum of keys gives the winner in its low bits, without gathers
+    """
+    best = np.zeros(grid.shape, dtype=np.uint16)
+    key = np.empty(grid.shape, dtype=np.uint16)
+    new = np.zeros(grid.shape, dtype=np.uint8)
+    for rank, p in enumerate(order):
+        birth, survival = _ruleRanges(tables[p])
+        np.multiply(neighbors[p - 1], 64, out=key)
+        key += (len(order) - rank) * 8 + p
+        key *= ~owned[p - 1] & _inRanges(neighbors[p - 1], birth)
+        np.maximum(best, key, out=best)
+        new += (owned[p - 1] & _inRanges(neighbors[p - 1], survival)) * np.uint8(p)
+    born = (best & 7).astype(np.uint8)
+    new = np.where(born > 0, born, new)
+    if changes is not None:
+        ys, xs = np.nonzero(new != grid)
+        changes.extend(zip(xs.tolist(), ys.tolist(), grid[ys, xs].tolist(), new[ys, xs].tolist()))
+    population = {}
+    for p in range(1, players + 1):
+        change = int(np.count_nonzero(new == p)) - int(np.count_nonzero(owned[p - 1]))
+        if change != 0:
+            population[p] = change
+    grid[:] = new
+    return population
+
+
+""" Bitboard engine: one bitboard per player, each row packed into one integer (bit x = column x) """
+class BitboardEngine:
+    __slots__ = ('cols', 'rows', 'full', 'boards', 'grid')
+
+    def __init__(self, size: (int, int)):
+        self.cols, self.rows = size
+        self.full = (1 << self.cols) - 1
+        self.boards = {}
+        self.grid = BitboardGrid(self)
+
+    """ Replace engine state with given grid (list of rows) """
+    def Load(self, grid):
+        self.rows = len(grid)
+        self.cols = len(grid[0]) if self.rows else 0
+        self.full = (1 << self.cols) - 1
+        self.boards = {}
+        for y, row in enumerate(grid):
+            for x, c in enumerate(row):
+                if c > 0:
+                    self.__getBoard(c)[y] |= 1 << x
+
+    """ Kill all cells """
+    def Clear(self):
+        self.boards = {}
+
+    """ Copy of engine state for Restore: rows are ints, so copying lists of rows copies bitboards """
+    def Snapshot(self):
+        return self.cols, self.rows, {p: board[:] for p, board in self.boards.items()}
+
+    """ Go back to state given by Snapshot (it stays usable) """
+    def Restore(self, state):
+        self.cols, self.rows, boards = state
+        self.full = (1 << self.cols) - 1
+        self.boards = {p: board[:] for p, board in boards.items()}
+
+    """ Player at cell (0 = dead) """
+    def Get(self, cell_x: int, cell_y: int) -> int:
+        bit = 1 << cell_x
+        for p, board in self.boards.items():
+            if board[cell_y] & bit:
+                return p
+        return 0
+
+    """ Put player on cell (0 = kill cell) """
+    def Set(self, cell_x: int, cell_y: int, player: int):
+        bit = 1 << cell_x
+        for board in self.boards.values():
+            board[cell_y] &= ~bit
+        if player > 0:
+            self.__getBoard(player)[cell_y] |= bit
+
+    """
+        Process move of player, same rules as GameOfLife.__getCellNewStatus (rule is rules module table).
+        Returns population changes. Changed cells (x, y, old, new) are added to changes list if given
+    """
+    def Step(self, player: int, changes: list=None, rule: tuple=rules.LIFE) -> dict:
+        board = self.boards.get(player)
+        if board is None:
+            return {}
+        new_board = self.__lifeRows(board) if rule == rules.LIFE else self.__ruleRows(board, rule)
+        born = []
+        dies = 0
+        for y, (r, new_r) in enumerate(zip(board, new_board)):
+            born.append(new_r & ~r)
+            dies += bin(r & ~new_r).count('1')
+            if changes is not None:
+                for x in _bits(r ^ new_r):
+                    changes.append((x, y, player, 0) if r >> x & 1 else (x, y, self.Get(x, y), player))
+        self.boards[player] = new_board
+        changes = {player: sum(bin(b).count('1') for b in born) - dies}
+        for p, other in self.boards.items():
+            if p != player:
+                replaced = 0
+                for y in range(self.rows):
+                    if born[y] & other[y]:
+                        replaced += bin(born[y] & other[y]).count('1')
+                        other[y] &= ~born[y]
+                changes[p] = -replaced
+        return changes
+
+    """ Next rows of board under B3/S23 """
+    def __lifeRows(self, board: list) -> list:
+        two_or_three, odd = self.__lifeCounts(board)
+        return [t & (r | o) for r, t, o in zip(board, two_or_three, odd)]
+
+    """
+        Rows of cells with 2 or 3 neighbors, and with odd count (3 = both).
+        Neighbors count is a sum of three 2-bit numbers:
+        row above (left + center + right), own row (left + right) and row below.
+        n == 2 or 3 <=> weight-2 part of the sum is exactly 1, n == 3 additionally needs odd weight-1 part
+    """
+    def __lifeCounts(self, board: list) -> (list, list):
+        rows, cols, full = self.rows, self.cols, self.full
+        three_lo, three_hi, two_lo, two_hi = [], [], [], []
+        for r in board:
+            left = ((r << 1) & full) | (r >> (cols - 1))
+            right = (r >> 1) | ((r & 1) << (cols - 1))
+            side = left ^ right
+            three_lo.append(side ^ r)
+            three_hi.append((left & right) | (r & side))
+            two_lo.append(side)
+            two_hi.append(left & right)
+        two_or_three, odds = [], []
+        for y in range(rows):
+            up, down = (y - 1) % rows, (y + 1) % rows
+            a, b, c = three_lo[up], two_lo[y], three_lo[down]
+            carry = (a & b) | (c & (a ^ b))
+            x1 = three_hi[up] ^ two_hi[y]
+            y1 = three_hi[up] & two_hi[y]
+            x2 = three_hi[down] ^ carry
+            y2 = three_hi[down] & carry
+            two_or_three.append((x1 ^ x2) & ~(y1 | y2))
+            odds.append(a ^ b ^ c)
+        return two_or_three, odds
+
+    """ Next rows of board under any rule: neighbors count kept in 4 bit planes, cells compared with each count of rule """
+    def __ruleRows(self, board: list, rule: tuple) -> list:
+        new_board = []
+        for r, planes in zip(board, self.__countPlanes(board)):
+            new_r = 0
+            for n in range(9):
+                if rule[n] or rule[9 + n]:
+                    count = self.__countMask(planes, n)
+                    new_r |= count & ((~r if rule[n] else 0) | (r if rule[9 + n] else 0))
+            new_board.append(new_r & self.full)
+        return new_board
+
+    """
+        Simultaneous move of all players (see NumpyEngine.StepAll), bit-parallel as Step. Rows of cells with each
+        neighbors count used by player's rule are taken once per player (B3/S23 by the adder of __lifeRows).
+        Births are claimed from most neighbors down and players in order, so first claim of a bit is the winner
+        of rules.Resolve; survivals keep unclaimed bits
+    """
+    def StepAll(self, order: list, tables: list, changes: list=None) -> dict:
+        players = [p for p in order if p in self.boards]
+        masks = {p: self.__countRows(self.boards[p], tables[p]) for p in players}
+        births = sorted(((n, rank, p) for rank, p in enumerate(players) for n in range(1, 9) if tables[p][n]),
+                        key=lambda birth: (-birth[0], birth[1]))
+        births = [(masks[p][n], self.boards[p], p) for n, rank, p in births]
+        survivals = [(self.boards[p], [masks[p][n] for n in range(9) if tables[p][9 + n]], p) for p in players]
+        new_boards = {p: [0] * self.rows for p in players}
+        for y in range(self.rows):
+            claimed = 0
+            for counts, board, p in births:
+                born = counts[y] & ~board[y] & ~claimed
+                if born:
+                    claimed |= born
+                    new_boards[p][y] |= born
+            for board, counts, p in survivals:
+                r = board[y] & ~claimed
+                if r:
+                    survival = 0
+                    for rows in counts:
+                        survival |= rows[y]
+                    new_boards[p][y] |= r & survival
+        population = {}
+        for p in players:
+            change = sum(bin(r).count('1') for r in new_boards[p]) - sum(bin(r).count('1') for r in self.boards[p])
+            if change != 0:
+                population[p] = change
+        if changes is not None:
+            for y in range(self.rows):
+                old = {p: self.boards[p][y] for p in players}
+                new = {p: new_boards[p][y] for p in players}
+                changed = 0
+                for p in players:
+                    changed |= old[p] ^ new[p]
+                for x in _bits(changed):
+                    bit = 1 << x
+                    changes.append((x, y, next((p for p in players if old[p] & bit), 0),
+                                    next((p for p in players if new[p] & bit), 0)))
+        for p in players:
+            self.boards[p] = new_boards[p]
+        return population
+
+    """ Rows of cells with n neighbors for every count n used by rule: {n: rows} """
+    def __countRows(self, board: list, rule: tuple) -> dict:
+        if rule == rules.LIFE:
+            two_or_three, odd = self.__lifeCounts(board)
+            return {3: [t & o for t, o in zip(two_or_three, odd)], 2: [t & ~o for t, o in zip(two_or_three, odd)]}
+        used = [n for n in range(9) if rule[n] or rule[9 + n]]
+        counts = {n: [] for n in used}
+        for planes in self.__countPlanes(board):
+            for n in used:
+                counts[n].append(self.__countMask(planes, n))
+        return counts
+
+    """ Neighbors count of every row of board as 4 bit planes (bit k of count of cell x is bit x of plane k) """
+    def __countPlanes(self, board: list) -> list:
+        rows, cols, full = self.rows, self.cols, self.full
+        lefts = [((r << 1) & full) | (r >> (cols - 1)) for r in board]
+        rights = [(r >> 1) | ((r & 1) << (cols - 1)) for r in board]
+        counts = []
+        for y in range(rows):
+            up, down = (y - 1) % rows, (y + 1) % rows
+            planes = [0, 0, 0, 0]
+            for bits in (lefts[up], board[up], rights[up], lefts[y], rights[y], lefts[down], board[down], rights[down]):
+                for k in range(4):
+                    carry = planes[k] & bits
+                    planes[k] ^= bits
+                    bits = carry
+                    if not bits:
+                        break
+            counts.append(planes)
+        return counts
+
+    """ Cells of row with exactly n neighbors """
+    def __countMask(self, planes: list, n: int) -> int:
+        count = self.full
+        for k in range(4):
+            count &= planes[k] if n >> k & 1 else ~planes[k]
+        return count
+
+    """ Count cells of each player (index 0 is not used) """
+    def Counts(self, players_number: int) -> list:
+        counts = [0] * (players_number + 1)
+        for p, board in self.boards.items():
+            counts[p] = sum(bin(r).count('1') for r in board)
+        return counts
+
+    def __getBoard(self, player: int) -> list:
+        if player not in self.boards:
+            self.boards[player] = [0] * self.rows
+        return self.boards[player]
+
+
+""" Adapter giving engines with Get/Set (bitboard, sparse) the grid[y][x] access of list grid """
+class BitboardGrid:
+    __slots__ = ('engine',)
+
+    def __init__(self, engine: BitboardEngine):
+        self.engine = engine
+
+    def __len__(self):
+        return self.engine.rows
+
+    def __getitem__(self, cell_y: int):
+        if not -self.engine.rows <= cell_y < self.engine.rows:
+            raise IndexError('grid row out of range')
+        return BitboardRow(self.engine, cell_y % self.engine.rows)
+
+    def __iter__(self):
+        for y in range(self.engine.rows):
+            yield BitboardRow(self.engine, y)
+
+
+""" Single row of BitboardGrid """
+class BitboardRow:
+    __slots__ = ('engine', 'y')
+
+    def __init__(self, engine: BitboardEngine, cell_y: int):
+        self.engine = engine
+        self.y = cell_y
+
+    def __len__(self):
+        return self.engine.cols
+
+    def __getitem__(self, cell_x: int) -> int:
+        if not -self.engine.cols <= cell_x < self.engine.cols:
+            raise IndexError('grid column out of range')
+        return self.engine.Get(cell_x % self.engine.cols, self.y)
+
+    def __setitem__(self, cell_x: int, player: int):
+        if not -self.engine.cols <= cell_x < self.engine.cols:
+            raise IndexError('grid column out of range')
+        self.engine.Set(cell_x % self.engine.cols, self.y, player)
+
+    def __iter__(self):
+        for x in range(self.engine.cols):
+            yield self.engine.Get(x, self.y)
+
+
+""" Neighbor offsets (dx, dy) """
+_NEIGHBORS = tuple((dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dx or dy)
+
+
+"""
+    Sparse engine: only live cells are stored (cell -> player, and set of cells of each player),
+    so memory and step cost scale with population, not with grid size
+"""
+class SparseEngine:
+    __slots__ = ('cols', 'rows', 'wrap', 'cells', 'players', 'grid')
+
+    """ wrap: toroidal grid as in other engines, otherwise unbounded plane (size is only the area seen through grid) """
+    def __init__(self, size: (int, int), wrap: bool=True):
+        self.cols, self.rows = size
+        self.wrap = wrap
+        self.cells = {}
+        self.players = {}
+        self.grid = BitboardGrid(self) if wrap else PlaneGrid(self)
+
+    """ Replace engine state with given grid (list of rows) """
+    def Load(self, grid):
+        self.rows = len(grid)
+        self.cols = len(grid[0]) if self.rows else 0
+        self.Clear()
+        for y, row in enumerate(grid):
+            for x, c in enumerate(row):
+                if c > 0:
+                    self.Set(x, y, c)
+
+    """ Kill all cells """
+    def Clear(self):
+        self.cells = {}
+        self.players = {}
+
+    """ Copy of engine state for Restore """
+    def Snapshot(self):
+        return self.cols, self.rows, dict(self.cells), {p: set(cells) for p, cells in self.players.items()}
+
+    """ Go back to state given by Snapshot (it stays usable) """
+    def Restore(self, state):
+        self.cols, self.rows, cells, players = state
+        self.cells = dict(cells)
+        self.players = {p: set(cells) for p, cells in players.items()}
+
+    """ Player at cell (0 = dead) """
+    def Get(self, cell_x: int, cell_y: int) -> int:
+        return self.cells.get((cell_x, cell_y), 0)
+
+    """ Put player on cell (0 = kill cell) """
+    def Set(self, cell_x: int, cell_y: int, player: int):
+        cell = (cell_x, cell_y)
+        old = self.cells.pop(cell, 0)
+        if old > 0:
+            self.players[old].discard(cell)
+        if player > 0:
+            self.cells[cell] = player
+            self.players.setdefault(player, set()).add(cell)
+
+    """
+        Process move of player, same rules as GameOfLife.__getCellNewStatus. Returns population changes.
+        Only neighborhoods of player's cells are visited. Changed cells (x, y, old, new) are added to changes list if given
+    """
+    def Step(self, player: int, changes: list=None, rule: tuple=rules.LIFE) -> dict:
+        live = self.players.get(player)
+        if not live:
+            return {}
+        if self.wrap:
+            cols, rows = self.cols, self.rows
+            neighbors = Counter(((x + dx) % cols, (y + dy) % rows) for x, y in live for dx, dy in _NEIGHBORS)
+        else:
+            neighbors = Counter((x + dx, y + dy) for x, y in live for dx, dy in _NEIGHBORS)
+        cells = self.cells
+        dies = [cell for cell in live if not rule[9 + neighbors.get(cell, 0)]]
+        born = [cell for cell, n in neighbors.items() if rule[n] and cells.get(cell) != player]
+        population = {player: len(born) - len(dies)}
+        for cell in dies:
+            del cells[cell]
+            live.discard(cell)
+            if changes is not None:
+                changes.append((cell[0], cell[1], player, 0))
+        for cell in born:
+            old = cells.get(cell, 0)
+            if old > 0:
+                self.players[old].discard(cell)
+                population[old] = population.get(old, 0) - 1
+            cells[cell] = player
+            live.add(cell)
+            if changes is not None:
+                changes.append((cell[0], cell[1], old, player))
+        return population
+
+    """
+        Simultaneous move of all players (see NumpyEngine.StepAll). All neighbor counts are taken before any change,
+        only neighborhoods of live cells are visited
+    """
+    def StepAll(self, order: list, tables: list, changes: list=None) -> dict:
+        cells = self.cells
+        births = {}
+        dies = []
+        for p in order:
+            live = self.players.get(p)
+            if not live:
+                continue
+            if self.wrap:
+                cols, rows = self.cols, self.rows
+                neighbors = Counter(((x + dx) % cols, (y + dy) % rows) for x, y in live for dx, dy in _NEIGHBORS)
+            else:
+                neighbors = Counter((x + dx, y + dy) for x, y in live for dx, dy in _NEIGHBORS)
+            rule = tables[p]
+            dies += [cell for cell in live if not rule[9 + neighbors.get(cell, 0)]]
+            """ Birth with most neighbors wins, ties go to player earlier in order """
+            for cell, n in [(cell, n) for cell, n in neighbors.items() if rule[n] and cells.get(cell) != p]:
+                if cell not in births or births[cell][0] < n:
+                    births[cell] = (n, p)
+        population = {}
+        for cell in dies:
+            if cell not in births:
+                p = cells.pop(cell)
+                self.players[p].discard(cell)
+                population[p] = population.get(p, 0) - 1
+                if changes is not None:
+                    changes.append((cell[0], cell[1], p, 0))
+        for cell, (n, p) in births.items():
+            old = cells.get(cell, 0)
+            if old > 0:
+                self.players[old].discard(cell)
+                population[old] = population.get(old, 0) - 1
+            cells[cell] = p
+            self.players[p].add(cell)
+            population[p] = population.get(p, 0) + 1
+            if changes is not None:
+                changes.append((cell[0], cell[1], old, p))
+        return population
+
+    """ Count cells of each player (index 0 is not used) """
+    def Counts(self, players_number: int) -> list:
+        counts = [0] * (players_number + 1)
+        for p, cells in self.players.items():
+            counts[p] = len(cells)
+        return counts
+
+
+""" Sparse engine on unbounded plane: cells beyond grid area live on, nothing wraps around """
+class PlaneEngine(SparseEngine):
+    __slots__ = ()
+
+    def __init__(self, size: (int, int)):
+        super().__init__(size, wrap=False)
+
+
+""" Grid of plane engine: any row can be accessed, iteration covers grid area only """
+class PlaneGrid(BitboardGrid):
+    __slots__ = ()
+
+    def __getitem__(self, cell_y: int):
+        return PlaneRow(self.engine, cell_y)
+
+    def __iter__(self):
+        for y in range(self.engine.rows):
+            yield PlaneRow(self.engine, y)
+
+
+""" Single row of PlaneGrid """
+class PlaneRow(BitboardRow):
+    __slots__ = ()
+
+    def __getitem__(self, cell_x: int) -> int:
+        return self.engine.Get(cell_x, self.y)
+
+    def __setitem__(self, cell_x: int, player: int):
+        self.engine.Set(cell_x, self.y, player)
+
+
+""" Striped engine: grid in shared memory, horizontal stripes stepped by pool of worker processes """
+class StripedEngine:
+    __slots__ = ('workers', 'shm', 'pool', 'buffers', 'current', 'stripes', 'release', '__weakref__')
+
+    def __init__(self, size: (int, int), workers: int=2):
+        if np is None:
+            raise ImportError('Striped engine requires numpy to be installed')
+        self.workers = workers
+        self.release = None
+        self.__allocate(size)
+
+    """ Current grid (view of shared buffer) """
+    @property
+    def grid(self):
+        return self.buffers[self.current]
+
+    """ Replace engine state with given grid (list of rows) """
+    def Load(self, grid):
+        grid = np.array(grid, dtype=np.uint8)
+        if grid.shape != self.grid.shape:
+            self.__allocate((grid.shape[1], grid.shape[0]))
+        self.grid[:] = grid
+
+    """ Kill all cells """
+    def Clear(self):
+        self.grid[:] = 0
+
+    """ Copy of engine state for Restore """
+    def Snapshot(self):
+        return self.grid.copy()
+
+    """ Go back to state given by Snapshot (it stays usable) """
+    def Restore(self, state):
+        self.Load(state)
+
+    """
+        Process move of player: workers write next grid to the other buffer, map returning is the barrier.
+        Returns population changes, changed cells (x, y, old, new) are added to changes list if given
+    """
+    def Step(self, player: int, changes: list=None, rule: tuple=rules.LIFE) -> dict:
+        dies, replaced = 0, []
+        jobs = [(player, self.current, y0, y1, rule) for y0, y1 in self.stripes]
+        for stripe_dies, stripe_replaced in self.pool.starmap(_stepStripe, jobs):
+            dies += stripe_dies
+            replaced += [0] * (len(stripe_replaced) - len(replaced))
+            for p, n in enumerate(stripe_replaced):
+                replaced[p] += n
+        if changes is not None:
+            old, new = self.buffers[self.current], self.buffers[self.current ^ 1]
+            ys, xs = np.nonzero(old != new)
+            changes.extend(zip(xs.tolist(), ys.tolist(), old[ys, xs].tolist(), new[ys, xs].tolist()))
+        self.current ^= 1
+        return _populationChanges(player, dies, replaced)
+
+    """ Simultaneous move of all players (see NumpyEngine.StepAll), done in this process: it is one pass anyway """
+    def StepAll(self, order: list, tables: list, changes: list=None) -> dict:
+        return _stepAll(self.grid, order, tables, changes)
+
+    """ Count cells of each player (index 0 is not used) """
+    def Counts(self, players_number: int) -> list:
+        counts = np.bincount(self.grid.ravel(), minlength=players_number + 1).tolist()
+        counts[0] = 0
+        return counts
+
+    """ Stop workers and free shared memory """
+    def Close(self):
+        if self.release is not None:
+            self.release()
+
+    """ Double buffer in shared memory, workers attached to it """
+    def __allocate(self, size: (int, int)):
+        self.Close()
+        cols, rows = size
+        shape = (2, rows, cols)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, 2 * rows * cols))
+        self.buffers = np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf)
+        self.buffers[:] = 0
+        self.current = 0
+        workers = max(1, min(self.workers, rows))
+        self.stripes = [(rows * i // workers, rows * (i + 1) // workers) for i in range(workers)]
+        self.pool = multiprocessing.Pool(workers, initializer=_attachStripeWorker, initargs=(self.shm.name, shape))
+        self.release = weakref.finalize(self, _releaseStriped, self.pool, self.shm)
+
+
+""" Shared buffers of striped engine, as seen by worker process """
+_stripe_shm = None
+_stripe_buffers = None
+
+
+def _attachStripeWorker(name: str, shape: tuple):
+    global _stripe_shm, _stripe_buffers
+    _stripe_shm = shared_memory.SharedMemory(name=name)
+    _stripe_buffers = np.ndarray(shape, dtype=np.uint8, buffer=_stripe_shm.buf)
+
+
+""" Worker part of StripedEngine.Step: rows [y0, y1) of next grid. Returns (died cells, bincount of cells replaced by births) """
+def _stepStripe(player: int, current: int, y0: int, y1: int, rule: tuple=rules.LIFE) -> tuple:
+    src = _stripe_buffers[current]
+    rows = src.shape[0]
+    # Stripe with one-row halos above and below, wrapped like % self.rows in GameOfLife
+    block = src.take(range(y0 - 1, y1 + 1), axis=0, mode='wrap')
+    accp = (block == player).view(np.uint8)
+    column = accp[:-2] + accp[1:-1] + accp[2:]
+    cells = accp[1:-1]
+    neighbors = column + np.roll(column, 1, axis=1) + np.roll(column, -1, axis=1) - cells
+    new = block[1:-1].copy()
+    birth, survival = _ruleRanges(rule)
+    dies = (cells == 1) & ~_inRanges(neighbors, survival)
+    born = (cells == 0) & _inRanges(neighbors, birth)
+    replaced = np.bincount(new[born], minlength=1)
+    new[dies] = 0
+    new[born] = player
+    _stripe_buffers[current ^ 1][y0:y1] = new
+    return int(np.count_nonzero(dies)), replaced.tolist()
+
+
+def _releaseStriped(pool, shm):
+    pool.terminate()
+    shm.close()
+    shm.unlink()
+
+
+""" Engines selectable by name in GameOfLife constructor """
+ENGINES = {
+    'numpy': NumpyEngine,
+    'bitboard': BitboardEngine,
+    'sparse': SparseEngine,
+    'plane': PlaneEngine,
+}
@@ -0,0 +1,176 @@
+""" HashLife engine: memoized quadtree stepping of plain B3/S23 life on toroidal grid """
+
+
+""" Quadtree node, level k covers 2^k x 2^k cells. Nodes are hash-consed, so equal nodes are the same object """
+class Node:
+    __slots__ = ('nw', 'ne', 'sw', 'se', 'level', 'population')
+
+    def __init__(self, nw, ne, sw, se, level: int, population: int):
+        self.nw, self.ne, self.sw, self.se = nw, ne, sw, se
+        self.level = level
+        self.population = population
+
+
+""" HashLife engine with bounded cache of nodes and results """
+class HashLife:
+    __slots__ = ('max_cache', 'nodes', 'results', 'empty', 'on', 'off')
+
+    def __init__(self, max_cache: int=1 << 20):
+        self.max_cache = max_cache
+        self.off = Node(None, None, None, None, 0, 0)
+        self.on = Node(None, None, None, None, 0, 1)
+        self.__clearCache()
+
+    """
+        Advance grid for given player by number of generations.
+        Grid must contain no cells of other players (rule is B3/S23 in that case).
+        Returns new grid as list of rows
+    """
+    def Advance(self, grid, player: int, generations: int) -> list:
+        rows = len(grid)
+        cols = len(grid[0]) if rows else 0
+        alive = [[c == player for c in row] for row in grid]
+        j = 0
+        while generations > 0:
+            """ Power-of-two jumps: one successor call per set bit of generations """
+            if generations & 1:
+                alive = self.__jump(alive, cols, rows, j)
+            generations >>= 1
+            j += 1
+        return [[player if c else 0 for c in row] for row in alive]
+
+    """ Advance torus by 2^j generations """
+    def __jump(self, alive, cols, rows, j) -> list:
+        level = j + 2
+        while 1 << (level - 1) < max(cols, rows):
+            level += 1
+        """
+            Node is filled with periodic tiling of torus, so its center (result of successor)
+            is exactly what torus becomes. Torus origin is put at center's corner
+        """
+        shift = 1 << (level - 2)
+        built = {}
+        node = self.__build(alive, cols, rows, -shift % cols, -shift % rows, level, built)
+        result = self.__successor(node, j)
+        new_alive = [[False] * cols for y in range(rows)]
+        self.__read(result, 0, 0, cols, rows, new_alive)
+        return new_alive
+
+    """ Node for periodic tiling starting at torus cell (x, y) """
+    def __build(self, alive, cols, rows, x, y, level, built) -> Node:
+        if level == 0:
+            return self.on if alive[y][x] else self.off
+        key = (x, y, level)
+        if key not in built:
+            half = 1 << (level - 1)
+            x2, y2 = (x + half) % cols, (y + half) % rows
+            built[key] = self.__join(self.__build(alive, cols, rows, x, y, level - 1, built),
+                                    self.__build(alive, cols, rows, x2, y, level - 1, built),
+                                    self.__build(alive, cols, rows, x, y2, level - 1, built),
+                                    self.__build(alive, cols, rows, x2, y2, level - 1, built))
+        return built[key]
+
+    """ Write alive cells of node located at (x, y) into window cols x rows """
+    def __read(self, node, x, y, cols, rows, alive):
+        if node.population == 0 or x >= cols or y >= rows:
+            return
+        if node.level == 0:
+            alive[y][x] = True
+            return
+        half = 1 << (node.level - 1)
+        self.__read(node.nw, x, y, cols, rows, alive)
+        self.__read(node.ne, x + half, y, cols, rows, alive)
+        self.__read(node.sw, x, y + half, cols, rows, alive)
+        self.__read(node.se, x + half, y + half, cols, rows, alive)
+
+    """ Canonical node for given quadrants """
+    def __join(self, nw, ne, sw, se) -> Node:
+        key = (nw, ne, sw, se)
+        node = self.nodes.get(key)
+        if node is None:
+            node = Node(nw, ne, sw, se, nw.level + 1,
+                        nw.population + ne.population + sw.population + se.population)
+            self.nodes[key] = node
+        return node
+
+    """ Canonical empty node of level """
+    def __empty(self, level: int) -> Node:
+        while len(self.empty) <= level:
+            e = self.empty[-1]
+            self.empty.append(self.__join(e, e, e, e))
+        return self.empty[level]
+
+    """ Center of node (level k - 1) advanced by 2^j generations, j <= k - 2 """
+    def __successor(self, node, j) -> Node:
+        if node.population == 0:
+            return self.__empty(node.level - 1)
+        key = (node, j)
+        result = self.results.get(key)
+        if result is not None:
+            return result
+        if node.level == 2:
+            result = self.__life4x4(node)
+        else:
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            """ 9 overlapping level k - 1 subnodes """
+            subnodes = (
+                nw,
+                self.__join(nw.ne, ne.nw, nw.se, ne.sw),
+                ne,
+                self.__join(nw.sw, nw.se, sw.nw, sw.ne),
+                self.__join(nw.se, ne.sw, sw.ne, se.nw),
+                self.__join(ne.sw, ne.se, se.nw, se.ne),
+                sw,
+                self.__join(sw.ne, se.nw, sw.se, se.sw),
+                se,
+            )
+            full = j == node.level - 2
+            """ Full jump is done as two half-jumps, otherwise subnodes are advanced once and centered """
+            step = j - 1 if full else j
+            c = [self.__successor(s, step) for s in subnodes]
+            quads = (
+                self.__join(c[0], c[1], c[3], c[4]),
+                self.__join(c[1], c[2], c[4], c[5]),
+                self.__join(c[3], c[4], c[6], c[7]),
+                self.__join(c[4], c[5], c[7], c[8]),
+            )
+            if full:
+                result = self.__join(*(self.__successor(q, step) for q in quads))
+            else:
+                result = self.__join(*(self.__center(q) for q in quads))
+        if len(self.results) >= self.max_cache:
+            self.__clearCache()
+        self.results[key] = result
+        return result
+
+    """ Center (level k - 1) of node """
+    def __center(self, node) -> Node:
+        return self.__join(node.nw.se, node.ne.sw, node.sw.ne, node.se.nw)
+
+    """ Base case: center 2x2 of 4x4 node after one generation """
+    def __life4x4(self, node) -> Node:
+        cells = []
+        rows = [
+            [node.nw.nw, node.nw.ne, node.ne.nw, node.ne.ne],
+            [node.nw.sw, node.nw.se, node.ne.sw, node.ne.se],
+            [node.sw.nw, node.sw.ne, node.se.nw, node.se.ne],
+            [node.sw.sw, node.sw.se, node.se.sw, node.se.se],
+        ]
+        for y in (1, 2):
+            for x in (1, 2):
+                neighbors = 0
+                for ny in (y - 1, y, y + 1):
+                    for nx in (x - 1, x, x + 1):
+                        if nx != x or ny != y:
+                            neighbors += rows[ny][nx].population
+                if rows[y][x].population:
+                    cells.append(self.on if 2 <= neighbors <= 3 else self.off)
+                else:
+                    cells.append(self.on if neighbors == 3 else self.off)
+        return self.__join(*cells)
+
+    """ Bounded memory: drop all memoized results and canonical nodes """
+    def __clearCache(self):
+        self.nodes = {}
+        self.results = {}
+        self.empty = [self.off]
@@ -2,23 +2,38 @@
 
 """ Game settings """
 class GameSettings:
-    __slots__ = ('players_number', 'rounds_number', 'generations_per_round', 'new_cells_per_round')
+    __slots__ = ('players_number', 'rounds_number', 'generations_per_round', 'new_cells_per_round', 'rules',
+                'simultaneous')
 
     def __init__(self,
                 players_number: int=2,
                 generations_per_round: int=10,
                 rounds_number = 10,
-                new_cells_per_round: int=20):
+                new_cells_per_round: int=20,
+                rules: str='B3/S23',
+                simultaneous: bool=False):
         self.players_number = players_number
         self.generations_per_round = generations_per_round
         self.rounds_number = rounds_number
         self.new_cells_per_round = new_cells_per_round
+        self.rules = rules
+        """ All players step at once from the same grid (1), or one after another in queue order (0) """
+        self.simultaneous = simultaneous
     
     """ Overwrite setter for validation """
     def __setattr__(self, name, val):
         if not name in self.__slots__:
             return
         
+        if name == 'rules':
+            """ B/S rulestring, or several separated by ';' (player p gets (p - 1)-th one, cycled) """
+            try:
+                val = ';'.join(rules.Canonical(rule) for rule in str(val).split(';'))
+            except ValueError:
+                return
+            super().__setattr__(name, val)
+            return
+        
         try:
             val = int(val)
         except ValueError:
@@ -33,6 +48,8 @@ class GameSettings:
             is_valid = 1 <= val <= 30
         elif name == 'new_cells_per_round':
             is_valid = 5 <= val <= 100
+        elif name == 'simultaneous':
+            is_valid = 0 <= val <= 1
         
         if is_valid:
             super().__setattr__(name, val)
@@ -46,85 +63,422 @@ class GameSettings:
             return "Number of game rounds"
         elif name == 'new_cells_per_round':
             return "Cells to add on each round"
+        elif name == 'rules':
+            return "Rules (B/S, ';' between players)"
+        elif name == 'simultaneous':
+            return "Simultaneous moves (0/1)"
+    
+    """ Lookup table of player's rule (see rules module) """
+    def Rule(self, player: int) -> tuple:
+        player_rules = self.rules.split(';')
+        return rules.Compile(player_rules[(player - 1) % len(player_rules)])
 
 
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import random
 import time
+try:
+    from . import engines, rules
+    from .hashlife import HashLife
+except ImportError:
+    import engines
+    import rules
+    from hashlife import HashLife
+
+""" File handler leaving flushing to listener: records are written in batches """
+class BatchedFileHandler(logging.FileHandler):
+
+    def emit(self, record):
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+""" Queue listener flushing its handlers once queue is drained """
+class BatchedQueueListener(logging.handlers.QueueListener):
+
+    def handle(self, record):
+        super().handle(record)
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+
+
+""" Listener of game log in current process (games only put records to its queue) """
+_log_listener = None
+_log_pid = None
+
+""" Logger shared by all games of process: one queue handler, file is written by listener thread """
+def GameLogger(path: str='logs/game.log') -> logging.Logger:
+    global _log_listener, _log_pid
+    logger = logging.getLogger('GameOfLife')
+    if _log_pid == os.getpid():
+        return logger
+    """ First game of process (or first after fork: parent's listener thread does not exist here) """
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    records = queue.SimpleQueue()
+    handler = BatchedFileHandler(path, delay=True)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+    _log_listener = BatchedQueueListener(records, handler)
+    _log_listener.start()
+    _log_pid = os.getpid()
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    logger.setLevel('INFO')
+    logger.propagate = False
+    return logger
+
+
+""" Write out queued records on exit """
+def _stopLogListener():
+    if _log_listener is not None and _log_pid == os.getpid():
+        _log_listener.stop()
+
+atexit.register(_stopLogListener)
+
+
+_MASK64 = (1 << 64) - 1
+
+""" Zobrist key of player's cell: 64-bit mix (splitmix64 finalizer) of cell and player, no table is kept """
+def _zobrist(cell_x: int, cell_y: int, player: int) -> int:
+    z = hash((cell_x, cell_y, player)) * 0x9E3779B97F4A7C15 & _MASK64
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9 & _MASK64
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EB & _MASK64
+    return z ^ (z >> 31)
+
+
+""" Tile-based change tracker: which parts of grid have to be recalculated for each player """
+class TileTracker:
+    __slots__ = ('tile_size', 'cols', 'rows', 'tiles_x', 'tiles_y', 'pending')
+
+    def __init__(self, size: (int, int), tile_size: int=8):
+        self.tile_size = tile_size
+        self.Reset(size)
+    
+    """ Forget all history: every tile is pending for every player """
+    def Reset(self, size: (int, int)):
+        self.cols, self.rows = size
+        self.tiles_x = -(-self.cols // self.tile_size)
+        self.tiles_y = -(-self.rows // self.tile_size)
+        # Players without entry have not moved yet, so all tiles are pending for them
+        self.pending = {}
+    
+    """ Take tiles that player has to recalculate on its move """
+    def Pending(self, player: int) -> set:
+        tiles = self.pending[player] if player in self.pending else self.__allTiles()
+        self.pending[player] = set()
+        return tiles
+    
+    """ Register changed cells: their tiles and tiles bordering them become pending """
+    def Changed(self, cells):
+        touched = set()
+        ts = self.tile_size
+        for cell in cells:
+            x, y = cell[0], cell[1]
+            for ny in (y - 1, y, y + 1):
+                for nx in (x - 1, x, x + 1):
+                    touched.add(((nx % self.cols) // ts, (ny % self.rows) // ts))
+        for tiles in self.pending.values():
+            tiles |= touched
+    
+    """ Cells (x, y) of tile """
+    def Cells(self, tile: (int, int)):
+        tx, ty = tile
+        ts = self.tile_size
+        for y in range(ty * ts, min((ty + 1) * ts, self.rows)):
+            for x in range(tx * ts, min((tx + 1) * ts, self.cols)):
+                yield x, y
+    
+    def __allTiles(self) -> set:
+        return {(tx, ty) for ty in range(self.tiles_y) for tx in range(self.tiles_x)}
+
+
+""" Saved game state (GameOfLife.Snapshot): board as one buffer, round, generation, queue and generator state """
+class GameSnapshot:
+    __slots__ = ('board', 'populations', 'winner', 'cur_round', 'cur_round_generation', 'players_queue',
+                'zobrist', 'seen', 'rng')
+
+    def __init__(self, board, populations: list, winner: list, cur_round: int, cur_round_generation: int,
+                players_queue: list, zobrist: int, seen: dict, rng):
+        self.board = board
+        self.populations = populations
+        self.winner = winner
+        self.cur_round = cur_round
+        self.cur_round_generation = cur_round_generation
+        self.players_queue = players_queue
+        self.zobrist = zobrist
+        self.seen = seen
+        self.rng = rng
+
 
 """ Game logic """
 class GameOfLife:
-    __slots__ = ('settings', 'cols', 'rows', 'grid', '__winner', 'logger',
-                'cur_round', 'cur_round_generation', 'cur_player', 'players_queue')
+    __slots__ = ('settings', 'cols', 'rows', '__grid', '__winner', 'logger', 'engine', 'tiles', 'hashlife',
+                'profiler', 'round_events', '__round_started', 'cycles', '__zobrist', '__seen', '__populations',
+                'cur_round', 'cur_round_generation', 'cur_player', '__rule', 'players_queue', 'seed', 'rng')
 
     def __init__(self,
                 size: (int, int)=(30,20),
-                settings: GameSettings=GameSettings()):
+                settings: GameSettings=GameSettings(),
+                engine: str='python',
+                tile_size: int=0,
+                hashlife: bool=False,
+                workers: int=0,
+                profiler=None,
+                round_events: bool=False,
+                cycles: bool=False,
+                seed: int=None):
         self.settings = settings
+        """ Game's own random generator (players queue shuffles): same seed - same game, None picks new seed """
+        self.seed = int.from_bytes(os.urandom(4), 'big') if seed is None else seed
+        self.rng = random.Random(self.seed)
         self.cols, self.rows = size
+        """ 'python' keeps grid as list of rows, others are taken from engines module """
+        if workers > 0:
+            """ Multiprocess stepping of numpy grid in shared memory """
+            if engine not in ('python', 'numpy'):
+                raise ValueError('Workers are only supported by numpy engine')
+            self.engine = engines.StripedEngine(size, workers)
+        elif engine == 'python':
+            self.engine = None
+        elif engine in engines.ENGINES:
+            self.engine = engines.ENGINES[engine](size)
+        else:
+            raise ValueError('Unknown engine: {}'.format(engine))
+        """ tile_size > 0 turns on skipping of unchanged tiles (python engine only) """
+        self.tiles = None
+        if tile_size > 0:
+            if self.engine is not None:
+                raise ValueError('Tile tracking is only supported by python engine')
+            self.tiles = TileTracker(size, tile_size)
+        """
+            HashLife runs whole rounds at once when only one player has cells. Other engines step a round faster
+            than HashLife builds its quadtree from the grid (and plane has no toroidal grid)
+        """
+        if hashlife and self.engine is not None:
+            raise ValueError('HashLife is only supported by python engine')
+        self.hashlife = HashLife() if hashlife else None
+        """ Optional profiling.Profiler: phases of moves are timed only when it is given """
+        self.profiler = profiler
+        """ round_events: log structured record (JSON) at end of each round """
+        self.round_events = round_events
+        self.__round_started = time.perf_counter()
+        """ cycles: repeated grid within round (still life, oscillator) ends round early, result is the same """
+        self.cycles = cycles
+        # Zobrist hash of grid and generations played in round for each hash seen in it
+        self.__zobrist = 0
+        self.__seen = None
+        # Rule table of player making move
+        self.__rule = self.settings.Rule(1)
         self.__winner = [0]
+        self.__populations = [0] * (self.settings.players_number + 1)
         self.players_queue = []
         for p in range(1, self.settings.players_number + 1):
             self.players_queue.append(p)
-        random.shuffle(self.players_queue)
+        self.rng.shuffle(self.players_queue)
         self.__setLogger()
     
     """ Start game preparations """
     def Start(self):
-        self.logger.info('Game for {} players started'.format(self.settings.players_number))
+        self.logger.info('Game for {} players started, seed {}'.format(self.settings.players_number, self.seed))
         self.cur_round = 1
         self.cur_round_generation = 1
         self.__resetGrid()
     
-    """ Game move logic """
-    def Move(self):
+    """
+        Game move logic.
+        With return_delta returns changes of each player's sub-step: [(player, [(x, y, old, new), ...]), ...]
+    """
+    def Move(self, return_delta: bool=False):
+        deltas = [] if return_delta else None
         # Just in case
         if self.IsOver:
-            return
+            return deltas
         
-        """ Each player's cells step to next generation """
-        for p in self.players_queue:
-            self.cur_player = p
-            self.__playerMove()
-        self.cur_round_generation += 1
+        if self.cur_round_generation == 1:
+            self.__round_started = time.perf_counter()
+        profiler = self.profiler
+        if profiler is not None:
+            started = time.perf_counter()
+        owner = self.__soleOwner() if self.hashlife is not None and self.cur_round_generation == 1 else 0
+        if owner > 0 and self.settings.Rule(owner) == rules.LIFE:
+            """ Other players have no cells, so round is plain B3/S23 for owner: skip to its end """
+            self.cur_player = owner
+            grid = self.hashlife.Advance(self.grid, owner, self.settings.generations_per_round)
+            if return_delta:
+                deltas.append((owner, [(x, y, old, c) for y, (old_row, row) in enumerate(zip(self.grid, grid))
+                                            for x, (old, c) in enumerate(zip(old_row, row)) if old != c]))
+            self.grid = grid
+            self.cur_round_generation = self.settings.generations_per_round + 1
+            if profiler is not None:
+                profiler.Add('hashlife', time.perf_counter() - started, owner, self.cur_round)
+        else:
+            if self.cycles and (self.__seen is None or self.cur_round_generation == 1):
+                self.__zobrist = self.__fullHash()
+                self.__seen = {self.__zobrist: self.cur_round_generation - 1}
+            self.__generation(deltas)
+            if self.cycles:
+                self.__skipCycle(deltas)
 
+        if profiler is not None:
+            profiler.Add('move', time.perf_counter() - started, 0, self.cur_round)
         """ Round generations ended - move to next round """
         if self.cur_round_generation > self.settings.generations_per_round:
-            self.__setWinner()
+            if profiler is None:
+                self.__setWinner()
+            else:
+                started = time.perf_counter()
+                self.__setWinner()
+                profiler.Add('set_winner', time.perf_counter() - started, 0, self.cur_round)
+            if self.round_events:
+                self.__logRoundEvent()
             self.cur_round += 1
             self.cur_round_generation = 1
             """ Or not (if all rounds complete) """
             if self.IsOver:
                 self.logger.info('Game over. {}'.format(self.Winner))
-                return
+                return deltas
             self.logger.info('Round {} ended. Current leader: {}'.format(self.cur_round - 1, self.Winner))
-            random.shuffle(self.players_queue)
+            self.rng.shuffle(self.players_queue)
+        return deltas
     
     """ Handler for adding cell on field """
     def AddCell(self, player: int, cell_x: int, cell_y: int) -> bool:
         if self.grid[cell_y][cell_x] != 0:
             return False
         
+        self.__seen = None
         self.grid[cell_y][cell_x] = player
+        self.__populations[player] += 1
+        if self.tiles is not None:
+            self.tiles.Changed([(cell_x, cell_y)])
         return True
     
 
+    """
+        Add cells of pattern (patterns.Pattern) with its top left corner at given cell, for up to limit cells.
+        Occupied cells are skipped, pattern wraps around grid edges. Returns number of added cells,
+        they are also appended as (x, y) to added list if given
+    """
+    def AddPattern(self, player: int, pattern, cell_x: int, cell_y: int, limit: int=None, added: list=None) -> int:
+        if getattr(self.engine, 'wrap', True):
+            cells = dict.fromkeys(((cell_x + dx) % self.cols, (cell_y + dy) % self.rows) for dx, dy in pattern.cells)
+        else:
+            cells = dict.fromkeys((cell_x + dx, cell_y + dy) for dx, dy in pattern.cells)
+        grid = self.grid
+        if engines.np is not None and isinstance(grid, engines.np.ndarray):
+            """ Array grids: all cells at once """
+            xs, ys = engines.np.array(list(cells), dtype=engines.np.intp).reshape(-1, 2).T
+            free = engines.np.flatnonzero(grid[ys, xs] == 0)[:limit]
+            grid[ys[free], xs[free]] = player
+            placed = list(zip(xs[free].tolist(), ys[free].tolist()))
+        else:
+            placed = []
+            for x, y in cells:
+                if len(placed) == limit:
+                    break
+                if grid[y][x] == 0:
+                    grid[y][x] = player
+                    placed.append((x, y))
+        self.__seen = None
+        self.__populations[player] += len(placed)
+        if self.tiles is not None:
+            self.tiles.Changed(placed)
+        if added is not None:
+            added.extend(placed)
+        return len(placed)
+    
+    """
+        State of started game, to go back to with Restore. Board is copied as one buffer (bytes of python grid,
+        engine's own copy otherwise), state of game's random generator is kept too
+    """
+    def Snapshot(self) -> GameSnapshot:
+        if self.engine is None:
+            board = b''.join(map(bytes, self.__grid))
+        else:
+            board = self.engine.Snapshot()
+        return GameSnapshot(board, list(self.__populations), list(self.__winner), self.cur_round,
+                            self.cur_round_generation, tuple(self.players_queue), self.__zobrist,
+                            None if self.__seen is None else dict(self.__seen), self.rng.getstate())
+    
+    """ Go back to state saved by Snapshot (snapshot can be restored any number of times) """
+    def Restore(self, snapshot: GameSnapshot):
+        self.__load(snapshot)
+        self.rng.setstate(snapshot.rng)
+    
+    """ Independent copy of started game: same settings and options, own grid and random generator in the same state """
+    def Clone(self) -> 'GameOfLife':
+        clone = GameOfLife.__new__(GameOfLife)
+        for name in self.__slots__:
+            name = '_GameOfLife' + name if name.startswith('__') else name
+            if hasattr(self, name):
+                setattr(clone, name, getattr(self, name))
+        clone.settings = copy.copy(self.settings)
+        clone.rng = random.Random()
+        clone.rng.setstate(self.rng.getstate())
+        size = (self.cols, self.rows)
+        if isinstance(self.engine, engines.StripedEngine):
+            clone.engine = engines.StripedEngine(size, self.engine.workers)
+        elif self.engine is not None:
+            clone.engine = type(self.engine)(size)
+        if self.tiles is not None:
+            clone.tiles = TileTracker(size, self.tiles.tile_size)
+        clone.__load(self.Snapshot())
+        return clone
+    
+    """ Set state from snapshot, except random generator """
+    def __load(self, snapshot: GameSnapshot):
+        if self.engine is None:
+            board, cols = snapshot.board, self.cols
+            self.__grid = [list(board[i:i + cols]) for i in range(0, len(board), cols)]
+            if self.tiles is not None:
+                self.tiles.Reset((self.cols, self.rows))
+        else:
+            self.engine.Restore(snapshot.board)
+        self.__populations = list(snapshot.populations)
+        self.__winner = list(snapshot.winner)
+        self.cur_round = snapshot.cur_round
+        self.cur_round_generation = snapshot.cur_round_generation
+        self.players_queue = list(snapshot.players_queue)
+        self.__zobrist = snapshot.zobrist
+        self.__seen = None if snapshot.seen is None else dict(snapshot.seen)
+    
     """ Class logger setup """
     def __setLogger(self):
-        self.logger = logging.getLogger('GameOfLife')
-        handler = logging.FileHandler('logs/game.log')
-        handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
-        self.logger.addHandler(handler)
-        self.logger.setLevel('INFO')
-        self.logger.propagate = False
+        self.logger = GameLogger()
+    
+    """ Structured record of ended round: populations and time spent on its moves """
+    def __logRoundEvent(self):
+        self.logger.info(json.dumps({
+            'event': 'round',
+            'round': self.cur_round,
+            'populations': self.__populations[1:],
+            'elapsed': time.perf_counter() - self.__round_started,
+        }))
     
     """ Reset game grid """
     def __resetGrid(self):
-        self.grid = []
+        if self.engine is not None:
+            """ Engines may not keep dense grid, so list of rows is not built """
+            self.engine.Clear()
+            self.__seen = None
+            self.__populations = [0] * (self.settings.players_number + 1)
+            return
+        grid = []
         for y in range(self.rows):
-            self.grid.append([])
+            grid.append([])
             for x in range(self.cols):
-                self.grid[y].append(0)
+                grid[y].append(0)
+        self.grid = grid
     
     # ACCP = Alive Cell of Current Player
     """ Get count of cell's neighbors that are ACCP """
@@ -133,52 +487,222 @@ class GameOfLife:
         for y in range(cell_y - 1, cell_y + 2):
             for x in range(cell_x - 1, cell_x + 2):
                 if x != cell_x or y != cell_y:
-                    count += (self.grid[y % self.rows][x % self.cols] == self.cur_player)
+                    count += (self.__grid[y % self.rows][x % self.cols] == self.cur_player)
         return count
     
     """ Get status of cell after current player's move """
     def __getCellNewStatus(self, cell_x, cell_y):
-        c = self.grid[cell_y][cell_x]
-        neighbors = self.__getACCPNeighborsCount(cell_x, cell_y)
+        return self.__applyRule(self.__grid[cell_y][cell_x], self.__getACCPNeighborsCount(cell_x, cell_y))
+    
+    """ Status of cell c having given count of ACCP neighbors after current player's move """
+    def __applyRule(self, c, neighbors):
         """
+            Current player's rule table (B3/S23 by default):
             if cell is ACCP:
-                if it has 2 or 3 ACCP neighbors:
+                if table says it survives with this neighbors count (2 or 3):
                     * it remains unchanged
                 else:
                     * it dies
             else:
-                if it has 3 ACCP neighbors:
+                if table says cell is born with this neighbors count (3):
                     * it becomes ACCP
                 else:
                     * it remains unchanged
         """
         if c == self.cur_player:
-            if not 2 <= neighbors <= 3:
+            if not self.__rule[9 + neighbors]:
                 c = 0
         else:
-            if neighbors == 3:
+            if self.__rule[neighbors]:
                 c = self.cur_player
         return c
     
-    """ Process move of current player, update grid accordingly """
-    def __playerMove(self):
+    """
+        Each player's cells step to next generation. Changes of each player are added to deltas if given,
+        in simultaneous mode there is one step with all changes, reported for player 0
+    """
+    def __generation(self, deltas: list=None):
+        for p in [0] if self.settings.simultaneous else self.players_queue:
+            self.cur_player = p
+            changes = [] if deltas is not None or self.cycles else None
+            if p == 0:
+                self.__simultaneousMove(changes)
+            elif self.profiler is None:
+                self.__playerMove(changes)
+            else:
+                self.__profiledPlayerMove(changes)
+            if self.cycles:
+                for x, y, old, new in changes:
+                    if old > 0:
+                        self.__zobrist ^= _zobrist(x, y, old)
+                    if new > 0:
+                        self.__zobrist ^= _zobrist(x, y, new)
+            if deltas is not None:
+                deltas.append((p, changes))
+        self.cur_round_generation += 1
+    
+    """
+        If grid repeats one seen earlier in round, it goes through the same cycle till round end:
+        only generations up to the round end's phase of the cycle are made, and round is ended
+    """
+    def __skipCycle(self, deltas: list=None):
+        played = self.cur_round_generation - 1
+        start = self.__seen.get(self.__zobrist)
+        if start is None:
+            self.__seen[self.__zobrist] = played
+            return
+        remaining = self.settings.generations_per_round - played
+        for g in range(remaining % (played - start)):
+            self.__generation(deltas)
+        self.cur_round_generation = self.settings.generations_per_round + 1
+        self.__seen = None
+        if self.profiler is not None:
+            self.profiler.Count('skipped_generations', remaining - remaining % (played - start), 0, self.cur_round)
+    
+    """ Zobrist hash of whole grid """
+    def __fullHash(self) -> int:
+        grid = self.grid
+        cells = getattr(self.engine, 'cells', None)
+        if cells is not None:
+            live = cells.items()
+        elif engines.np is not None and isinstance(grid, engines.np.ndarray):
+            ys, xs = engines.np.nonzero(grid)
+            live = zip(zip(xs.tolist(), ys.tolist()), grid[ys, xs].tolist())
+        else:
+            live = (((x, y), c) for y, row in enumerate(grid) for x, c in enumerate(row) if c > 0)
+        h = 0
+        for (x, y), c in live:
+            h ^= _zobrist(x, y, c)
+        return h
+    
+    """ Process move of current player, update grid accordingly. Changed cells are added to changes list if given """
+    def __playerMove(self, changes: list=None):
+        self.__rule = self.settings.Rule(self.cur_player)
+        if self.engine is not None:
+            for p, change in self.engine.Step(self.cur_player, changes, self.__rule).items():
+                self.__populations[p] += change
+            return
+        if self.tiles is not None:
+            self.__trackedPlayerMove(changes)
+            return
         grid = []
         for y in range(self.rows):
             grid.append([])
             for x in range(self.cols):
-                grid[y].append(self.__getCellNewStatus(x, y))
-        self.grid = grid
+                c = self.__getCellNewStatus(x, y)
+                grid[y].append(c)
+                if c != self.__grid[y][x]:
+                    self.__cellChanged(self.__grid[y][x], c)
+                    if changes is not None:
+                        changes.append((x, y, self.__grid[y][x], c))
+        self.__grid = grid
+    
+    """ __playerMove with timing of its phases, counters are kept per player and round """
+    def __profiledPlayerMove(self, changes: list=None):
+        profiler = self.profiler
+        profiler.Context(self.cur_player, self.cur_round)
+        recorded = [] if changes is None else changes
+        started = time.perf_counter()
+        if self.engine is not None or self.tiles is not None:
+            self.__playerMove(recorded)
+        else:
+            """ Same as python engine's __playerMove, but split into phases """
+            self.__rule = self.settings.Rule(self.cur_player)
+            grid = [[0] * self.cols for y in range(self.rows)]
+            allocated = time.perf_counter()
+            neighbors = [[self.__getACCPNeighborsCount(x, y) for x in range(self.cols)] for y in range(self.rows)]
+            counted = time.perf_counter()
+            for y, row in enumerate(self.__grid):
+                for x, old in enumerate(row):
+                    c = self.__applyRule(old, neighbors[y][x])
+                    grid[y][x] = c
+                    if c != old:
+                        self.__cellChanged(old, c)
+                        recorded.append((x, y, old, c))
+            self.__grid = grid
+            profiler.Add('allocation', allocated - started)
+            profiler.Add('neighbors', counted - allocated)
+            profiler.Add('rules', time.perf_counter() - counted)
+            profiler.Count('cells_evaluated', self.cols * self.rows)
+        profiler.Add('player_move', time.perf_counter() - started)
+        profiler.Count('cells_changed', len(recorded))
+    
+    """
+        All players move at once from the same grid, in one pass over it (see rules.Resolve for conflicts,
+        earlier player in queue wins ties). Changed cells are added to changes list if given
+    """
+    def __simultaneousMove(self, changes: list=None):
+        profiler = self.profiler
+        if profiler is not None:
+            started = time.perf_counter()
+            if changes is None:
+                changes = []
+        order = self.players_queue
+        tables = [None] + [self.settings.Rule(p) for p in range(1, self.settings.players_number + 1)]
+        if getattr(self.engine, 'StepAll', None) is not None:
+            for p, change in self.engine.StepAll(order, tables, changes).items():
+                self.__populations[p] += change
+        else:
+            """ Python grid (or dense view of engine's grid) """
+            grid = self.grid
+            if self.tiles is not None:
+                """ Tiles with no changes around them since last move would not change again """
+                tiles = set().union(*(self.tiles.Pending(p) for p in order))
+                cells = (cell for tile in tiles for cell in self.tiles.Cells(tile))
+            else:
+                cells = ((x, y) for y in range(self.rows) for x in range(self.cols))
+            changed = []
+            for x, y in cells:
+                c = rules.Resolve(grid[y][x], self.__getNeighborsCounts(grid, x, y), order, tables)
+                if c != grid[y][x]:
+                    changed.append((x, y, c))
+            for x, y, c in changed:
+                self.__cellChanged(grid[y][x], c)
+                if changes is not None:
+                    changes.append((x, y, grid[y][x], c))
+                grid[y][x] = c
+            if self.tiles is not None:
+                self.tiles.Changed(changed)
+        if profiler is not None:
+            profiler.Add('simultaneous_move', time.perf_counter() - started, 0, self.cur_round)
+            profiler.Count('cells_changed', len(changes), 0, self.cur_round)
+    
+    """ Neighbors of cell of each player (index 0 counts dead cells) """
+    def __getNeighborsCounts(self, grid, cell_x, cell_y) -> list:
+        counts = [0] * (self.settings.players_number + 1)
+        for y in range(cell_y - 1, cell_y + 2):
+            row = grid[y % self.rows]
+            for x in range(cell_x - 1, cell_x + 2):
+                if x != cell_x or y != cell_y:
+                    counts[row[x % self.cols]] += 1
+        return counts
+    
+    """ Process move of current player only on tiles where something could change """
+    def __trackedPlayerMove(self, changes: list=None):
+        changed = []
+        for tile in self.tiles.Pending(self.cur_player):
+            for x, y in self.tiles.Cells(tile):
+                c = self.__getCellNewStatus(x, y)
+                if c != self.__grid[y][x]:
+                    changed.append((x, y, c))
+        for x, y, c in changed:
+            self.__cellChanged(self.__grid[y][x], c)
+            if changes is not None:
+                changes.append((x, y, self.__grid[y][x], c))
+            self.__grid[y][x] = c
+        self.tiles.Changed(changed)
+    
+    """ Update population counters for cell changed from old to new value """
+    def __cellChanged(self, old: int, new: int):
+        if old > 0:
+            self.__populations[old] -= 1
+        if new > 0:
+            self.__populations[new] += 1
 
     
     """ Set game winner """
     def __setWinner(self):
-        counts = [0]
-        for p in range(self.settings.players_number):
-            counts.append(0)
-        for y in range(self.rows):
-            for x in range(self.cols):
-                if self.grid[y][x] > 0:
-                    counts[self.grid[y][x]] += 1
+        counts = self.__populations
         self.__winner = [0]
         for p in range(1, self.settings.players_number + 1):
             if counts[p] == 0:
@@ -189,6 +713,46 @@ class GameOfLife:
                 self.__winner.append(p)
     
     
+    """ Count cells of each player (index 0 is not used) """
+    def __countCells(self) -> list:
+        if self.engine is not None:
+            return self.engine.Counts(self.settings.players_number)
+        counts = [0]
+        for p in range(self.settings.players_number):
+            counts.append(0)
+        for row in self.__grid:
+            for c in row:
+                if c > 0:
+                    counts[c] += 1
+        return counts
+    
+    """ The only player having cells on grid (0 if there are several or none) """
+    def __soleOwner(self) -> int:
+        alive = [p for p in range(1, len(self.__populations)) if self.__populations[p] > 0]
+        return alive[0] if len(alive) == 1 else 0
+    
+    
+    """ Game grid: list of rows for python engine, engine's own grid otherwise """
+    @property
+    def grid(self):
+        return self.__grid if self.engine is None else self.engine.grid
+    
+    @grid.setter
+    def grid(self, grid):
+        if self.engine is None:
+            self.__grid = grid
+            if self.tiles is not None:
+                self.tiles.Reset((len(grid[0]) if grid else 0, len(grid)))
+        else:
+            self.engine.Load(grid)
+        self.__seen = None
+        self.__populations = self.__countCells()
+    
+    """ Number of cells of each player (index 0 is not used), kept up to date on every change """
+    @property
+    def Populations(self) -> list:
+        return list(self.__populations)
+    
     @property
     def IsOver(self) -> bool:
         return self.cur_round > self.settings.rounds_number
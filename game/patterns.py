@@ -0,0 +1,114 @@
+""" Pattern library: patterns in RLE format, with rotations and reflections computed once per pattern
+
+    RLE: '#' lines are comments ('#N name' gives name), 'x = ..., y = ...' is header,
+    body is runs of 'b' (dead cell), 'o' (alive cell) and '$' (end of row) with optional counts, '!' ends pattern.
+"""
+
+import os
+
+
+""" Rotations and reflections (xx, xy, yx, yy): (x, y) -> (xx * x + xy * y, yx * x + yy * y) """
+_TRANSFORMS = ((0, -1, 1, 0), (-1, 0, 0, -1), (0, 1, -1, 0), (-1, 0, 0, 1), (1, 0, 0, -1), (0, 1, 1, 0), (0, -1, -1, 0))
+
+
+""" Alive cells placed together """
+class Pattern:
+    __slots__ = ('name', 'cells', 'width', 'height', '__variants')
+
+    """ cells: alive cells (dx, dy), they are moved so that pattern starts at (0, 0) """
+    def __init__(self, name: str, cells):
+        cells = list(cells)
+        min_x = min((x for x, y in cells), default=0)
+        min_y = min((y for x, y in cells), default=0)
+        self.name = name
+        self.cells = tuple(sorted((x - min_x, y - min_y) for x, y in cells))
+        self.width = max((x for x, y in self.cells), default=-1) + 1
+        self.height = max((y for x, y in self.cells), default=-1) + 1
+        self.__variants = None
+
+    """ Distinct rotations and reflections of pattern (first one is pattern itself), computed on first call """
+    def Variants(self) -> tuple:
+        if self.__variants is None:
+            variants = [self]
+            seen = {self.cells}
+            for xx, xy, yx, yy in _TRANSFORMS:
+                variant = Pattern(self.name, ((xx * x + xy * y, yx * x + yy * y) for x, y in self.cells))
+                if variant.cells not in seen:
+                    seen.add(variant.cells)
+                    variants.append(variant)
+            self.__variants = tuple(variants)
+        return self.__variants
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __repr__(self):
+        return 'Pattern({!r}, {}x{}, {} cells)'.format(self.name, self.width, self.height, len(self.cells))
+
+
+""" Pattern from RLE text """
+def ParseRLE(text: str, name: str='') -> Pattern:
+    cells = []
+    x = y = 0
+    count = ''
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('#'):
+            if line[1:2] == 'N' and not name:
+                name = line[2:].strip()
+            continue
+        if line.startswith('x'):
+            continue
+        for ch in line:
+            if ch.isdigit():
+                count += ch
+                continue
+            n = int(count) if count else 1
+            count = ''
+            if ch in 'b.':
+                x += n
+            elif ch == '$':
+                y += n
+                x = 0
+            elif ch == '!':
+                return Pattern(name, cells)
+            elif ch.isalpha():
+                cells.extend((x + i, y) for i in range(n))
+                x += n
+            elif not ch.isspace():
+                raise ValueError('Unexpected {!r} in RLE'.format(ch))
+    return Pattern(name, cells)
+
+
+""" Pattern from .rle file (named after file if it has no name) """
+def LoadRLE(path: str) -> Pattern:
+    with open(path) as f:
+        pattern = ParseRLE(f.read())
+    if not pattern.name:
+        pattern.name = os.path.splitext(os.path.basename(path))[0]
+    return pattern
+
+
+""" Built-in patterns by name """
+PATTERNS = {name: ParseRLE(rle, name) for name, rle in (
+    ('block', '2o$2o!'),
+    ('blinker', '3o!'),
+    ('glider', 'bo$2bo$3o!'),
+    ('r-pentomino', 'b2o$2o$bo!'),
+    ('beehive', 'b2o$o2bo$b2o!'),
+    ('toad', 'b3o$3o!'),
+    ('lwss', 'bo2bo$o$o3bo$4o!'),
+    ('acorn', 'bo$3bo$2o2b3o!'),
+    ('diehard', '6bo$2o$bo3b3o!'),
+)}
+
+
+""" Add patterns of .rle files in directory to PATTERNS, returns added names """
+def LoadDirectory(path: str) -> list:
+    names = []
+    for filename in sorted(os.listdir(path)):
+        if filename.endswith('.rle'):
+            pattern = LoadRLE(os.path.join(path, filename))
+            PATTERNS[pattern.name] = pattern
+            names.append(pattern.name)
+    return names
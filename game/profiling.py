@@ -0,0 +1,102 @@
+""" Opt-in timing instrumentation: timers and counters per phase, player and round
+
+    Instrumented code checks for profiler being None, so it costs nothing when profiling is off.
+"""
+
+import json
+import threading
+from collections import defaultdict
+
+
+""" Histogram of durations: bucket i counts durations in [2^(i-1), 2^i) microseconds """
+class Histogram:
+    __slots__ = ('count', 'total', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * 40
+
+    def Add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.buckets[min(int(seconds * 1e6).bit_length(), len(self.buckets) - 1)] += 1
+
+    """ Upper bound (seconds) of duration for given share of samples """
+    def Percentile(self, q: float) -> float:
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= q * self.count:
+                return (1 << i) / 1e6
+        return 0.0
+
+
+""" Sink writing every timing record as JSON line (buffered) """
+class JsonLinesSink:
+
+    def __init__(self, path: str, buffer_size: int=1 << 16):
+        self.file = open(path, 'a', buffering=buffer_size)
+
+    def __call__(self, record: dict):
+        self.file.write(json.dumps(record) + '\n')
+
+    def Close(self):
+        self.file.close()
+
+
+class Profiler:
+
+    def __init__(self, sink=None):
+        # Callable taking record dict, e.g. JsonLinesSink
+        self.sink = sink
+        # (phase, player, round) -> Histogram
+        self.histograms = defaultdict(Histogram)
+        # (counter, player, round) -> value
+        self.counters = defaultdict(int)
+        # Player and round for records of code not knowing them (engines)
+        self.player = 0
+        self.round = 0
+        self.lock = threading.Lock()
+
+    """ Current player and round """
+    def Context(self, player: int, cur_round: int):
+        self.player = player
+        self.round = cur_round
+
+    """ Add duration of phase """
+    def Add(self, phase: str, seconds: float, player: int=None, cur_round: int=None):
+        player = self.player if player is None else player
+        cur_round = self.round if cur_round is None else cur_round
+        with self.lock:
+            self.histograms[(phase, player, cur_round)].Add(seconds)
+        if self.sink is not None:
+            self.sink({'phase': phase, 'seconds': seconds, 'player': player, 'round': cur_round})
+
+    """ Increase counter """
+    def Count(self, counter: str, n: int=1, player: int=None, cur_round: int=None):
+        player = self.player if player is None else player
+        cur_round = self.round if cur_round is None else cur_round
+        with self.lock:
+            self.counters[(counter, player, cur_round)] += n
+
+    """ Timings per phase (all players and rounds together), sorted by total time """
+    def Summary(self) -> list:
+        phases = defaultdict(Histogram)
+        with self.lock:
+            for (phase, player, cur_round), h in self.histograms.items():
+                total = phases[phase]
+                total.count += h.count
+                total.total += h.total
+                total.buckets = [a + b for a, b in zip(total.buckets, h.buckets)]
+        summary = []
+        for phase, h in phases.items():
+            summary.append({
+                'phase': phase,
+                'count': h.count,
+                'total': h.total,
+                'mean': h.total / h.count,
+                'p50': h.Percentile(0.5),
+                'p99': h.Percentile(0.99),
+            })
+        return sorted(summary, key=lambda s: -s['total'])
@@ -0,0 +1,326 @@
+""" Game replays: compact append-only binary log of games
+
+    File is a sequence of games. Game:
+        header:   b'PGOL', version, cols, rows, players, generations, rounds, cells, seed + 1 (0 = none), players queue,
+                  rules length and rules (ASCII, since version 2), simultaneous moves flag (since version 3)
+        records:  b'R' round, players queue, placements count, placements (player, x, y)
+                  b'K' round, generation, size, run-length encoded grid (runs count, then value and length of each run)
+                  b'I' keyframes count, (round, generation, offset of keyframe from game start) for each keyframe
+                       (only written by older versions: reader finds keyframes while reading records anyway)
+                  b'E' end of game
+    Keyframe (round, generation) is GameOfLife's cur_round and cur_round_generation right after the move,
+    i.e. before placements if it is start of round. Keyframe is written after every move that crossed a multiple of
+    keyframe_every generations (with cycles or hashlife one move can play the rest of round).
+    Numbers are unsigned LEB128 varints, players and cell values are single bytes.
+    Replaying needs only placements: stepping is deterministic.
+"""
+
+import mmap
+from collections import OrderedDict
+from .logic import GameSettings, GameOfLife
+
+
+MAGIC = b'PGOL'
+VERSION = 3
+
+
+def _writeVarint(buf: bytearray, n: int):
+    while n > 0x7f:
+        buf.append((n & 0x7f) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
+def _readVarint(data, pos: int) -> (int, int):
+    n = shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7f) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+""" Run-length encode grid (rows joined) into buffer """
+def EncodeGrid(buf: bytearray, grid):
+    runs = []
+    value, length = None, 0
+    for row in grid:
+        for c in row:
+            c = int(c)
+            if c == value:
+                length += 1
+            else:
+                if length:
+                    runs.append((value, length))
+                value, length = c, 1
+    if length:
+        runs.append((value, length))
+    _writeVarint(buf, len(runs))
+    for value, length in runs:
+        buf.append(value)
+        _writeVarint(buf, length)
+
+
+""" Decode grid written by EncodeGrid, returns (grid, position after it) """
+def DecodeGrid(data, pos: int, cols: int, rows: int) -> (list, int):
+    cells = []
+    runs, pos = _readVarint(data, pos)
+    for r in range(runs):
+        value = data[pos]
+        length, pos = _readVarint(data, pos + 1)
+        cells.extend([value] * length)
+    return [cells[y * cols:(y + 1) * cols] for y in range(rows)], pos
+
+
+""" Records game into replay file: use it in place of game (AddCell and Move are recorded) """
+class ReplayWriter:
+
+    """
+        keyframe_every: write full grid every that many generations (0 = placements only).
+        Games are replayed on wrapping grid and numbers are unsigned, so plane engine and negative seeds are not supported
+    """
+    def __init__(self, path: str, game: GameOfLife, keyframe_every: int=0, buffer_size: int=1 << 16):
+        if not getattr(game.engine, 'wrap', True):
+            raise ValueError('Replays can not record games on unbounded plane')
+        if game.seed < 0:
+            raise ValueError('Replays can not record negative seed {}'.format(game.seed))
+        self.game = game
+        self.keyframe_every = keyframe_every
+        self.placements = []
+        self.file = open(path, 'ab', buffering=buffer_size)
+        settings = game.settings
+        buf = bytearray(MAGIC)
+        buf.append(VERSION)
+        _writeVarint(buf, game.cols)
+        _writeVarint(buf, game.rows)
+        buf += bytes((settings.players_number, settings.generations_per_round,
+                    settings.rounds_number, settings.new_cells_per_round))
+        _writeVarint(buf, game.seed + 1)
+        buf += bytes(game.players_queue)
+        rules = settings.rules.encode('ascii')
+        _writeVarint(buf, len(rules))
+        buf += rules
+        buf.append(settings.simultaneous)
+        self.file.write(buf)
+
+    """ Add cell to game, remember it if it was added """
+    def AddCell(self, player: int, cell_x: int, cell_y: int) -> bool:
+        if not self.game.AddCell(player, cell_x, cell_y):
+            return False
+        self.placements.append((player, cell_x, cell_y))
+        return True
+
+    """ Add pattern to game, remember its added cells """
+    def AddPattern(self, player: int, pattern, cell_x: int, cell_y: int, limit: int=None) -> int:
+        added = []
+        self.game.AddPattern(player, pattern, cell_x, cell_y, limit, added)
+        self.placements.extend((player, x, y) for x, y in added)
+        return len(added)
+
+    """ Game move: round's placements are written before its first generation """
+    def Move(self):
+        game = self.game
+        if game.IsOver:
+            return
+        if game.cur_round_generation == 1:
+            buf = bytearray(b'R')
+            _writeVarint(buf, game.cur_round)
+            buf += bytes(game.players_queue)
+            _writeVarint(buf, len(self.placements))
+            for player, x, y in self.placements:
+                buf.append(player)
+                _writeVarint(buf, x)
+                _writeVarint(buf, y)
+            self.file.write(buf)
+            self.placements = []
+        played = self.__played()
+        game.Move()
+        if self.keyframe_every > 0 and self.__played() // self.keyframe_every > played // self.keyframe_every:
+            self.Keyframe()
+
+    """ Write full grid of current game state """
+    def Keyframe(self):
+        buf = bytearray(b'K')
+        _writeVarint(buf, self.game.cur_round)
+        _writeVarint(buf, self.game.cur_round_generation)
+        grid = bytearray()
+        EncodeGrid(grid, self.game.grid)
+        _writeVarint(buf, len(grid))
+        self.file.write(buf + grid)
+
+    """ Everything else is taken from game """
+    def __getattr__(self, name: str):
+        return getattr(self.game, name)
+
+    """ Finish game record (end mark) and close file """
+    def Close(self):
+        self.file.write(b'E')
+        self.file.close()
+
+    """ Generations played by game so far """
+    def __played(self) -> int:
+        return (self.game.cur_round - 1) * self.game.settings.generations_per_round + self.game.cur_round_generation - 1
+
+
+""" Single recorded game, frames can be taken in any order """
+class Replay:
+    __slots__ = ('settings', 'cols', 'rows', 'seed', 'players_queue', 'rounds', 'keyframes',
+                'data', 'cache', 'cache_size', '__game')
+
+    def __init__(self, settings: GameSettings, size: (int, int), seed: int, players_queue: list,
+                data=None, cache_size: int=256):
+        self.settings = settings
+        self.cols, self.rows = size
+        self.seed = seed
+        self.players_queue = players_queue
+        # Players queue and placements of each round
+        self.rounds = {}
+        # Generations played -> position of keyframe grid in data
+        self.keyframes = {}
+        self.data = data
+        # LRU of decoded frames: generations played -> grid (after placements at round start)
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.__game = None
+
+    """ Replay game generation by generation, yields game after each move """
+    def Play(self, engine: str='python'):
+        game = GameOfLife(size=(self.cols, self.rows), settings=self.settings, engine=engine, seed=self.seed)
+        game.Start()
+        for cur_round in sorted(self.rounds):
+            self.__placeCells(game, cur_round)
+            for g in range(self.settings.generations_per_round):
+                game.Move()
+                yield game
+
+    """
+        Grid when game had given cur_round and cur_round_generation (after placements at start of round).
+        Starts from nearest keyframe or cached frame before it, so at most keyframe_every - 1 moves are made
+    """
+    def Frame(self, cur_round: int, cur_round_generation: int) -> tuple:
+        generations = self.settings.generations_per_round
+        target = (cur_round - 1) * generations + cur_round_generation - 1
+        if target in self.cache:
+            self.cache.move_to_end(target)
+            return self.cache[target]
+        start = max((k for k in self.keyframes if k <= target), default=None)
+        cached = max((k for k in self.cache if k <= target and (start is None or k >= start)), default=None)
+        game = self.__getGame()
+        if cached is not None:
+            current, grid, placed = cached, self.cache[cached], True
+        elif start is not None:
+            current, placed = start, False
+            grid, pos = DecodeGrid(self.data, self.keyframes[start], self.cols, self.rows)
+        else:
+            current, grid, placed = 0, [[0] * self.cols for y in range(self.rows)], False
+        game.grid = [list(row) for row in grid]
+        game.cur_round = current // generations + 1
+        game.cur_round_generation = current % generations + 1
+        if game.cur_round in self.rounds:
+            game.players_queue = list(self.rounds[game.cur_round][0])
+        while True:
+            if current % generations == 0 and not placed:
+                self.__placeCells(game, game.cur_round)
+            self.__remember(current, game.grid)
+            if current == target:
+                return self.cache[current]
+            game.Move()
+            current += 1
+            placed = False
+
+    """ Put round's players queue and placements into game """
+    def __placeCells(self, game: GameOfLife, cur_round: int):
+        if cur_round not in self.rounds:
+            return
+        queue, placements = self.rounds[cur_round]
+        game.players_queue = list(queue)
+        for player, x, y in placements:
+            game.AddCell(player, x, y)
+
+    def __remember(self, generations: int, grid):
+        self.cache[generations] = tuple(tuple(int(c) for c in row) for row in grid)
+        self.cache.move_to_end(generations)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    """ Game used for stepping between frames """
+    def __getGame(self) -> GameOfLife:
+        if self.__game is None:
+            self.__game = GameOfLife(size=(self.cols, self.rows), settings=self.settings, seed=self.seed)
+            self.__game.Start()
+        return self.__game
+
+
+""" Reads games from replay file (memory-mapped) """
+class ReplayReader:
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    """ All games of file """
+    def Games(self):
+        pos = 0
+        while pos < len(self.data):
+            replay, pos = self.__readGame(pos)
+            yield replay
+
+    def Close(self):
+        self.data.close()
+
+    def __readGame(self, pos: int) -> (Replay, int):
+        data = self.data
+        start = pos
+        if data[pos:pos + 4] != MAGIC or not 1 <= data[pos + 4] <= VERSION:
+            raise ValueError('Not a replay at offset {}'.format(pos))
+        version = data[pos + 4]
+        cols, pos = _readVarint(data, pos + 5)
+        rows, pos = _readVarint(data, pos)
+        players, generations, rounds, cells = data[pos:pos + 4]
+        seed, pos = _readVarint(data, pos + 4)
+        settings = GameSettings(players_number=players, generations_per_round=generations,
+                                rounds_number=rounds, new_cells_per_round=cells)
+        queue = list(data[pos:pos + players])
+        pos += players
+        if version >= 2:
+            length, pos = _readVarint(data, pos)
+            settings.rules = bytes(data[pos:pos + length]).decode('ascii')
+            pos += length
+        if version >= 3:
+            settings.simultaneous = data[pos]
+            pos += 1
+        replay = Replay(settings, (cols, rows), seed - 1 if seed else None, queue, data)
+        while True:
+            tag = data[pos:pos + 1]
+            pos += 1
+            if tag == b'E':
+                return replay, pos
+            elif tag == b'R':
+                cur_round, pos = _readVarint(data, pos)
+                queue = list(data[pos:pos + players])
+                count, pos = _readVarint(data, pos + players)
+                placements = []
+                for i in range(count):
+                    player = data[pos]
+                    x, pos = _readVarint(data, pos + 1)
+                    y, pos = _readVarint(data, pos)
+                    placements.append((player, x, y))
+                replay.rounds[cur_round] = (queue, placements)
+            elif tag == b'K':
+                """ Keyframes are decoded only when needed """
+                cur_round, pos = _readVarint(data, pos)
+                generation, pos = _readVarint(data, pos)
+                size, pos = _readVarint(data, pos)
+                replay.keyframes[(cur_round - 1) * generations + generation - 1] = pos
+                pos += size
+            elif tag == b'I':
+                count, pos = _readVarint(data, pos)
+                for i in range(count):
+                    cur_round, pos = _readVarint(data, pos)
+                    generation, pos = _readVarint(data, pos)
+                    offset, pos = _readVarint(data, pos)
+                    replay.keyframes[(cur_round - 1) * generations + generation - 1] = start + offset
+            else:
+                raise ValueError('Unknown replay record {} at offset {}'.format(tag, pos - 1))
@@ -0,0 +1,54 @@
+""" Life-like rules given by B/S rulestrings (B3/S23 is Conway's Life, B36/S23 is HighLife, B3678/S34678 is Day & Night)
+
+    Rule is compiled to lookup table: table[alive * 9 + neighbors] is 1 if cell is alive after move.
+    Rules with B0 are not supported: cells far from any life would be born.
+"""
+
+import functools
+
+
+""" Canonical form of rulestring: 'B3/S23'. Accepts B/S in any order and case, and S/B form without letters ('23/3') """
+def Canonical(rulestring: str) -> str:
+    parts = rulestring.strip().upper().split('/')
+    if len(parts) != 2:
+        raise ValueError('Rule must be B.../S...: {!r}'.format(rulestring))
+    if parts[0][:1].isdigit() or parts[0] == '':
+        parts = ['S' + parts[0], 'B' + parts[1]]
+    counts = {}
+    for part in parts:
+        kind, digits = part[:1], part[1:]
+        if kind not in ('B', 'S') or kind in counts or not all(d in '012345678' for d in digits):
+            raise ValueError('Rule must be B.../S...: {!r}'.format(rulestring))
+        counts[kind] = ''.join(sorted(set(digits)))
+    if '0' in counts['B']:
+        raise ValueError('B0 rules are not supported: {!r}'.format(rulestring))
+    return 'B{}/S{}'.format(counts['B'], counts['S'])
+
+
+""" Lookup table of rule """
+@functools.lru_cache(maxsize=None)
+def Compile(rulestring: str) -> tuple:
+    birth, survival = Canonical(rulestring)[1:].split('/S')
+    return tuple(int(str(n) in birth) for n in range(9)) + tuple(int(str(n) in survival) for n in range(9))
+
+
+LIFE = Compile('B3/S23')
+
+
+"""
+    New value of cell in simultaneous move of all players: counts[p] is number of p's neighbors,
+    tables[p] is p's rule table. Births replace cells of other players (as in sequential moves);
+    when several players have birth there, the one with most neighbors gets the cell, ties go to
+    player earlier in order. Otherwise the owner's cell survives or dies by owner's rule
+"""
+def Resolve(cell: int, counts, order, tables) -> int:
+    born, most = 0, -1
+    for p in order:
+        n = counts[p]
+        if p != cell and n > most and tables[p][n]:
+            born, most = p, n
+    if born:
+        return born
+    if cell and not tables[cell][9 + counts[cell]]:
+        return 0
+    return cell
@@ -1,3 +1,10 @@
+import os
+from profiling import JsonLinesSink, Profiler
 from ui import GUI
 
-GUI().Run()
\ No newline at end of file
+""" PYGOL_PROFILE=path.jsonl writes timings of game and drawing phases to that file """
+profile = os.environ.get('PYGOL_PROFILE')
+sink = JsonLinesSink(profile) if profile else None
+GUI(Profiler(sink) if sink else None).Run()
+if sink:
+    sink.Close()
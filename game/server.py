@@ -0,0 +1,268 @@
+""" WebSocket game server: plain ASGI application hosting many games in one process
+
+    Messages are JSON objects. Client -> server:
+        {"action": "join", "game": id, "size": [cols, rows], "settings": {...}}   (size and settings used if game is new)
+        {"action": "add", "player": p, "x": x, "y": y}                             (while players add cells)
+        {"action": "ready", "player": p}                                           (player finished adding cells)
+    Server -> client:
+        {"type": "state", ...}        full grid and player of connection, sent once on join
+        {"type": "cells", ...}        added cells
+        {"type": "generation", ...}   changed cells [x, y, value] after each generation
+        {"type": "round", ...}        round results
+        {"type": "error", "message": ...}
+    Round starts when every player used all of its cells or sent ready.
+    Each connection gets first free player of game on join (none if all are taken: it only watches), "player" of
+    add and ready is optional and must be that player.
+"""
+
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from .logic import GameSettings, GameOfLife
+
+
+""" Game hosted by server with its connected clients """
+class GameRoom:
+
+    def __init__(self, game_id: str, game: GameOfLife, speed: int=10):
+        self.game_id = game_id
+        self.game = game
+        # Generations per second, 0 = as fast as possible
+        self.speed = speed
+        self.connections = set()
+        self.placing = True
+        self.added = {}
+        self.ready = set()
+        self.task = None
+        # Connection -> its player
+        self.players = {}
+        self.game.Start()
+        self.shown = self.__gridCopy()
+
+    """ Connect client, returns its player (None if all players are taken) """
+    def Join(self, connection) -> int:
+        self.connections.add(connection)
+        if connection not in self.players:
+            taken = set(self.players.values())
+            free = [p for p in range(1, self.game.settings.players_number + 1) if p not in taken]
+            if free:
+                self.players[connection] = free[0]
+        return self.players.get(connection)
+
+    def Leave(self, connection):
+        self.connections.discard(connection)
+        self.players.pop(connection, None)
+
+    """ Full state for newly joined client """
+    def State(self, connection) -> dict:
+        return {
+            'type': 'state',
+            'game': self.game_id,
+            'player': self.players.get(connection),
+            'cols': self.game.cols,
+            'rows': self.game.rows,
+            'grid': self.shown,
+            'round': self.game.cur_round,
+            'generation': self.game.cur_round_generation,
+            'players_queue': self.game.players_queue,
+            'placing': self.placing,
+        }
+
+    """ Add cell of player, returns error message (None if cell was added) """
+    def AddCell(self, player: int, cell_x: int, cell_y: int) -> str:
+        if not self.placing:
+            return 'Cells can be added only before round starts'
+        if player not in self.game.players_queue:
+            return 'No such player'
+        if not (0 <= cell_x < self.game.cols and 0 <= cell_y < self.game.rows):
+            return 'Cell is out of grid'
+        if self.added.get(player, 0) >= self.game.settings.new_cells_per_round:
+            return 'No cells left for this round'
+        if not self.game.AddCell(player, cell_x, cell_y):
+            return 'Cell is occupied'
+        self.added[player] = self.added.get(player, 0) + 1
+        self.shown[cell_y][cell_x] = player
+        return None
+
+    """ Whether all players are done with adding cells """
+    @property
+    def AllReady(self) -> bool:
+        cells = self.game.settings.new_cells_per_round
+        return all(p in self.ready or self.added.get(p, 0) >= cells for p in self.game.players_queue)
+
+    """ One generation (runs in executor), returns changed cells """
+    def Step(self) -> list:
+        changed = {}
+        for player, changes in self.game.Move(return_delta=True):
+            for x, y, old, new in changes:
+                changed[(x, y)] = new
+        changes = []
+        for (x, y), c in changed.items():
+            # Cell could be changed back by later player
+            if self.shown[y][x] != c:
+                self.shown[y][x] = c
+                changes.append([x, y, c])
+        return changes
+
+    """ Round is over: players add cells again """
+    def NextRound(self):
+        self.placing = not self.game.IsOver
+        self.added = {}
+        self.ready = set()
+
+    def __gridCopy(self) -> list:
+        return [[int(c) for c in row] for row in self.game.grid]
+
+
+""" ASGI application: WebSocket connections to game rooms """
+class GameServer:
+
+    def __init__(self, workers: int=4, speed: int=10, max_size: int=500):
+        self.rooms = {}
+        # Rooms being created: game id -> future of room
+        self.building = {}
+        self.speed = speed
+        # Limit of board side, grid of new game is allocated from client's size
+        self.max_size = max_size
+        # Stepping is done off the event loop, so big boards do not stall other games
+        self.executor = ThreadPoolExecutor(workers)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'websocket':
+            raise ValueError('GameServer handles only websocket connections')
+        room = None
+        try:
+            while True:
+                event = await receive()
+                if event['type'] == 'websocket.connect':
+                    await send({'type': 'websocket.accept'})
+                elif event['type'] == 'websocket.disconnect':
+                    return
+                elif event['type'] == 'websocket.receive':
+                    try:
+                        message = json.loads(event.get('text') or event.get('bytes') or '')
+                        room = await self.__handle(message, room, send)
+                    except (ValueError, KeyError, TypeError) as e:
+                        await self.__send(send, {'type': 'error', 'message': 'Bad message: {}'.format(e)})
+        finally:
+            if room is not None:
+                self.__leave(room, send)
+
+    async def __handle(self, message: dict, room: GameRoom, send) -> GameRoom:
+        action = message['action']
+        if action == 'join':
+            joined = await self.__getRoom(str(message['game']), message)
+            if room is not None and room is not joined:
+                self.__leave(room, send)
+            room = joined
+            room.Join(send)
+            await self.__send(send, room.State(send))
+        elif room is None:
+            await self.__send(send, {'type': 'error', 'message': 'Join game first'})
+        elif action in ('add', 'ready'):
+            player = room.players.get(send)
+            if player is None:
+                await self.__send(send, {'type': 'error', 'message': 'All players of game are taken'})
+            elif int(message.get('player', player)) != player:
+                await self.__send(send, {'type': 'error', 'message': 'Connection plays for player {}'.format(player)})
+            elif action == 'add':
+                x, y = int(message['x']), int(message['y'])
+                error = room.AddCell(player, x, y)
+                if error is not None:
+                    await self.__send(send, {'type': 'error', 'message': error})
+                else:
+                    await self.__broadcast(room, {'type': 'cells', 'changes': [[x, y, player]]})
+                    self.__startRoundIfReady(room)
+            else:
+                room.ready.add(player)
+                self.__startRoundIfReady(room)
+        else:
+            await self.__send(send, {'type': 'error', 'message': 'Unknown action: {}'.format(action)})
+        return room
+
+    """ Room of game, new game is created and started in executor: big boards take a while """
+    async def __getRoom(self, game_id: str, message: dict) -> GameRoom:
+        if game_id in self.rooms:
+            return self.rooms[game_id]
+        building = self.building.get(game_id)
+        if building is None:
+            settings = GameSettings(**message.get('settings', {}))
+            cols, rows = (int(n) for n in message.get('size', (30, 20)))
+            if not (1 <= cols <= self.max_size and 1 <= rows <= self.max_size):
+                raise ValueError('size must be from 1x1 to {0}x{0}'.format(self.max_size))
+            create = lambda: GameRoom(game_id, GameOfLife(size=(cols, rows), settings=settings), self.speed)
+            building = self.building[game_id] = asyncio.get_running_loop().run_in_executor(self.executor, create)
+        try:
+            room = await building
+        finally:
+            self.building.pop(game_id, None)
+        return self.rooms.setdefault(game_id, room)
+
+    def __leave(self, room: GameRoom, send):
+        room.Leave(send)
+        if not room.connections and (room.task is None or room.task.done()):
+            self.rooms.pop(room.game_id, None)
+
+    def __startRoundIfReady(self, room: GameRoom):
+        if room.placing and room.AllReady:
+            room.placing = False
+            room.task = asyncio.ensure_future(self.__playRound(room))
+
+    """ Step all generations of round, broadcasting changes of each one """
+    async def __playRound(self, room: GameRoom):
+        loop = asyncio.get_running_loop()
+        game = room.game
+        for g in range(game.settings.generations_per_round):
+            cur_round, generation = game.cur_round, game.cur_round_generation
+            changes = await loop.run_in_executor(self.executor, room.Step)
+            await self.__broadcast(room, {'type': 'generation', 'round': cur_round, 'generation': generation, 'changes': changes})
+            if room.speed > 0:
+                await asyncio.sleep(1 / room.speed)
+        room.NextRound()
+        await self.__broadcast(room, {'type': 'round', 'round': game.cur_round - 1, 'populations': game.Populations,
+                                    'winner': game.Winner, 'over': game.IsOver, 'players_queue': game.players_queue})
+        if not room.connections:
+            self.rooms.pop(room.game_id, None)
+
+    """ Send message to every client of room, clients that failed to get it leave room """
+    async def __broadcast(self, room: GameRoom, message: dict):
+        text = json.dumps(message)
+        connections = list(room.connections)
+        results = await asyncio.gather(*(send({'type': 'websocket.send', 'text': text}) for send in connections),
+                                       return_exceptions=True)
+        for send, result in zip(connections, results):
+            if isinstance(result, Exception):
+                self.__leave(room, send)
+
+    async def __send(self, send, message: dict):
+        await send({'type': 'websocket.send', 'text': json.dumps(message)})
+
+
+""" In-process WebSocket client for ASGI application (tests and tools) """
+class LocalClient:
+
+    def __init__(self, application, path: str='/ws/game/'):
+        self.application = application
+        self.scope = {'type': 'websocket', 'path': path, 'headers': [], 'query_string': b''}
+        self.incoming = asyncio.Queue()
+        self.outgoing = asyncio.Queue()
+        self.task = None
+
+    async def Connect(self) -> bool:
+        self.task = asyncio.ensure_future(self.application(self.scope, self.incoming.get, self.outgoing.put))
+        await self.incoming.put({'type': 'websocket.connect'})
+        return (await self.outgoing.get())['type'] == 'websocket.accept'
+
+    async def Send(self, message: dict):
+        await self.incoming.put({'type': 'websocket.receive', 'text': json.dumps(message)})
+
+    async def Receive(self, timeout: float=5) -> dict:
+        event = await asyncio.wait_for(self.outgoing.get(), timeout)
+        return json.loads(event['text'])
+
+    async def Disconnect(self):
+        await self.incoming.put({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(self.task, 5)
+
+
+application = GameServer()
@@ -1,5 +1,18 @@
 """ Tests module """
+import asyncio
+import json
+import logging
+import os
+import random
+import tempfile
+from unittest import mock, skipIf
 from django.test import TestCase
+from . import ai, batch, bench, engines, patterns, profiling, replay, rules, server
+try:
+    from . import ui
+except ImportError:
+    # pygame or tkinter is not installed
+    ui = None
 from .logic import GameSettings, GameOfLife
 
 
@@ -111,6 +124,652 @@ class GameOfLifeTestCase(TestCase):
         ]
         self.assertEqual(game.grid, grid)
     
+    @skipIf(engines.np is None, 'numpy is not installed')
+    def test_NumpyEngine(self):
+        self.__assertMatchesPythonEngine(engine='numpy')
+    
+    def test_BitboardEngine(self):
+        self.__assertMatchesPythonEngine(engine='bitboard')
+        self.__assertMatchesPythonEngine(size=(1,3), moves=3, engine='bitboard')
+    
+    def test_SparseEngine(self):
+        self.__assertMatchesPythonEngine(engine='sparse')
+        self.__assertMatchesPythonEngine(size=(1,3), moves=3, engine='sparse')
+        """ Million cells wide board: only live cells are stored """
+        game = GameOfLife(size=(1000000,1000000), engine='sparse')
+        game.Start()
+        for x, y in ((1,0), (2,1), (0,2), (1,2), (2,2)):
+            game.AddCell(1, x - 1, y - 1)
+        for g in range(4):
+            game.Move()
+        # Glider crossed the edge and moved by (1, 1)
+        self.assertEqual(sorted(game.engine.cells), [(0,2), (1,0), (1,2), (2,1), (2,2)])
+        self.assertEqual(game.Populations[1], 5)
+    
+    def test_PlaneEngine(self):
+        game = GameOfLife(size=(5,5), settings=GameSettings(players_number=1), engine='plane')
+        game.Start()
+        """ Blinker on the edge does not wrap around """
+        for x in (-1, 0, 1):
+            game.AddCell(1, x, 0)
+        game.Move()
+        self.assertEqual(sorted(game.engine.cells), [(0,-1), (0,0), (0,1)])
+        self.assertEqual(game.grid[-1][0], 1)
+        self.assertEqual(game.grid[4][0], 0)
+        self.assertEqual([list(row) for row in game.grid][0], [1,0,0,0,0])
+        self.assertEqual(game.Populations, [0, 3])
+        for engine in ('plane', 'bitboard'):
+            with self.assertRaises(ValueError):
+                GameOfLife(engine=engine, hashlife=True)
+    
+    @skipIf(engines.np is None, 'numpy is not installed')
+    def test_StripedEngine(self):
+        self.__assertMatchesPythonEngine(workers=3)
+        self.__assertMatchesPythonEngine(size=(4,2), moves=3, workers=3)
+    
+    def test_Cycles(self):
+        # Whole games with and without skipping give the same results at the end of every round
+        settings = GameSettings(players_number=3, generations_per_round=30, rounds_number=4)
+        rnd = random.Random(3)
+        grid = [[rnd.choice([0,0,0,1,2,3]) for x in range(12)] for y in range(9)]
+        results = []
+        for options in ({}, {'cycles': True}, {'cycles': True, 'engine': 'sparse'}, {'cycles': True, 'tile_size': 4}):
+            game = GameOfLife(size=(12,9), settings=settings, seed=11, **options)
+            game.Start()
+            game.grid = [row[:] for row in grid]
+            rounds = []
+            while not game.IsOver:
+                game.Move()
+                if game.cur_round_generation == 1:
+                    rounds.append((game.Populations, [[int(c) for c in row] for row in game.grid]))
+            results.append(rounds)
+        self.assertEqual(results[1:], results[:1] * 3)
+        """ Blinker and block: grid after 2 moves is the starting one, so round of 25 generations ends on 2nd move """
+        settings = GameSettings(players_number=2, generations_per_round=25, rounds_number=1)
+        game = GameOfLife(size=(10,8), settings=settings, cycles=True)
+        expected = GameOfLife(size=(10,8), settings=settings)
+        for g in (game, expected):
+            g.Start()
+            g.players_queue = [1, 2]
+            for x in (1, 2, 3):
+                g.AddCell(1, x, 1)
+            for x, y in ((6,5), (7,5), (6,6), (7,6)):
+                g.AddCell(2, x, y)
+        before = [row[:] for row in game.grid]
+        moves = 0
+        while not game.IsOver:
+            for p, changes in game.Move(return_delta=True):
+                for x, y, old, new in changes:
+                    before[y][x] = new
+            moves += 1
+        while not expected.IsOver:
+            expected.Move()
+        self.assertEqual(moves, 2)
+        self.assertEqual(game.grid, expected.grid)
+        self.assertEqual(before, expected.grid)
+        self.assertEqual((game.Populations, game.Winner), (expected.Populations, expected.Winner))
+    
+    def test_Rules(self):
+        self.assertEqual([rules.Canonical(r) for r in ('b36/s23', 'S23/B3', '23/3', 'B3678/S34687')],
+                        ['B36/S23', 'B3/S23', 'B3/S23', 'B3678/S34678'])
+        for invalid in ('B0/S23', 'B9/S2', 'B3S23', 'B3/B2', 'B3/', '/S23'):
+            with self.assertRaises(ValueError):
+                rules.Canonical(invalid)
+        self.assertEqual(rules.LIFE, (0,0,0,1,0,0,0,0,0, 0,0,1,1,0,0,0,0,0))
+        settings = GameSettings(rules='B36/S23;b3678/s34678')
+        settings.rules = 'B0/S'
+        self.assertEqual(settings.rules, 'B36/S23;B3678/S34678')
+        self.assertEqual((settings.Rule(1)[6], settings.Rule(2)[9 + 6], settings.Rule(3)[6]), (1, 1, 1))
+        """ HighLife: cell with 6 neighbors is born """
+        game = GameOfLife(size=(5,5), settings=GameSettings(players_number=1, rules='B36/S23'))
+        game.Start()
+        for x, y in ((1,1), (2,1), (3,1), (1,3), (2,3), (3,3)):
+            game.AddCell(1, x, y)
+        game.Move()
+        self.assertEqual(game.grid[2][2], 1)
+        """ Every engine gives the same result with different rule for each player """
+        mixed = 'B36/S23;B3678/S34678;B2/S;B35678/S5678'
+        options = [{}, {'engine': 'bitboard'}, {'engine': 'sparse'}, {'tile_size': 4}]
+        if engines.np is not None:
+            options += [{'engine': 'numpy'}, {'workers': 2}]
+        for o in options:
+            self.__assertMatchesPythonEngine(rules=mixed, **o)
+        self.__assertMatchesPythonEngine(size=(1,3), moves=3, rules=mixed, engine='bitboard')
+    
+    def test_Simultaneous(self):
+        life = rules.LIFE
+        self.assertEqual(rules.Resolve(0, [0, 3, 3], [2, 1], [None, life, life]), 2)
+        self.assertEqual(rules.Resolve(1, [0, 2, 3], [1, 2], [None, life, life]), 2)
+        self.assertEqual(rules.Resolve(1, [0, 2, 2], [1, 2], [None, life, life]), 1)
+        b34 = rules.Compile('B34/S23')
+        self.assertEqual(rules.Resolve(0, [0, 3, 4], [1, 2], [None, b34, b34]), 2)
+        """ Birth conflict: both players have 3 neighbors at center, first in queue gets it """
+        for queue in ([1, 2], [2, 1]):
+            game = GameOfLife(size=(7,7), settings=GameSettings(players_number=2, simultaneous=True))
+            game.Start()
+            game.players_queue = queue
+            for x in (2, 3, 4):
+                game.AddCell(1, x, 2)
+                game.AddCell(2, x, 4)
+            deltas = game.Move(return_delta=True)
+            self.assertEqual([p for p, changes in deltas], [0])
+            self.assertEqual(game.grid[3][3], queue[0])
+            self.assertEqual([game.grid[1][3], game.grid[5][3]], [1, 2])
+            self.assertEqual(game.Populations, self.__countCells(game))
+        """ Every engine gives the same result as python one """
+        options = [{'tile_size': 4}, {'engine': 'bitboard'}, {'engine': 'sparse'}]
+        if engines.np is not None:
+            options += [{'engine': 'numpy'}, {'workers': 2}]
+        for o in options:
+            self.__assertMatchesPythonEngine(simultaneous=True, **o)
+            self.__assertMatchesPythonEngine(simultaneous=True, rules='B36/S23;B3678/S34678;B2/S;B3/S23', **o)
+    
+    def test_Snapshot(self):
+        settings = GameSettings(players_number=3, rounds_number=4, generations_per_round=3)
+        options = [{}, {'tile_size': 4}, {'engine': 'bitboard'}, {'engine': 'sparse'}, {'engine': 'plane'}]
+        if engines.np is not None:
+            options += [{'engine': 'numpy'}, {'workers': 2}]
+        for o in options:
+            game = GameOfLife(size=(12,10), settings=settings, seed=5, **o)
+            game.Start()
+            rnd = random.Random(2)
+            game.grid = [[rnd.choice([0,0,1,2,3]) for x in range(12)] for y in range(10)]
+            game.Move()
+            snapshot = game.Snapshot()
+            clone = game.Clone()
+            """ Moves over round ends: queue is shuffled again the same way after Restore """
+            played = []
+            for m in range(5):
+                game.Move()
+                played.append(([[int(c) for c in row] for row in game.grid], game.Populations, game.players_queue[:],
+                                game.cur_round, game.cur_round_generation, game.Winner))
+            for attempt in range(2):
+                game.Restore(snapshot)
+                for expected in played:
+                    game.Move()
+                    self.assertEqual(([[int(c) for c in row] for row in game.grid], game.Populations,
+                                    game.players_queue[:], game.cur_round, game.cur_round_generation, game.Winner),
+                                    expected)
+            """ Clone is independent: its moves do not change original and give the same grids """
+            before = [[int(c) for c in row] for row in game.grid]
+            clone.Move()
+            self.assertEqual([[int(c) for c in row] for row in clone.grid], played[0][0])
+            self.assertEqual(clone.Populations, played[0][1])
+            self.assertEqual([[int(c) for c in row] for row in game.grid], before)
+    
+    def test_Seed(self):
+        settings = GameSettings(players_number=5, rounds_number=6, generations_per_round=1)
+        random.seed(0)
+        state = random.getstate()
+        queues = {}
+        for seed in (7, 7, 8):
+            game = GameOfLife(size=(6,6), settings=settings, seed=seed)
+            self.assertEqual(game.seed, seed)
+            records = []
+            handler = logging.Handler()
+            handler.emit = records.append
+            game.logger.addHandler(handler)
+            try:
+                game.Start()
+            finally:
+                game.logger.removeHandler(handler)
+            self.assertIn('seed {}'.format(seed), records[0].getMessage())
+            played = [game.players_queue[:]]
+            while not game.IsOver:
+                game.Move()
+                played.append(game.players_queue[:])
+            self.assertEqual(queues.setdefault(seed, played), played)
+        self.assertNotEqual(queues[7], queues[8])
+        # Global random is not used
+        self.assertEqual(random.getstate(), state)
+        self.assertNotEqual(GameOfLife(settings=settings).seed, GameOfLife(settings=settings).seed)
+        """ Batch game depends only on its seed """
+        config = {'size': (12,10), 'players': 3, 'rounds': 3, 'generations': 4, 'cells': 10, 'policies': ['random']}
+        results = []
+        for state in (1, 2):
+            random.seed(state)
+            result = batch.PlayGame(config, 0, 42)
+            results.append((result['rounds'], result['winner']))
+        self.assertEqual(results[0], results[1])
+    
+    @skipIf(ui is None, 'pygame is not installed')
+    def test_Viewport(self):
+        viewport = ui.Viewport.Fitting((640,480), (32,24))
+        self.assertEqual((viewport.level, viewport.cell_size, viewport.Columns, viewport.Rows), (1, 20, 32, 24))
+        self.assertEqual(ui.Viewport.Fitting((640,480), (8,6)).level, 0)
+        self.assertEqual(viewport.CellAt((45,25)), (2,1))
+        """ Toroidal board: viewport wraps around edges """
+        moved = viewport.Moved(-40, 0)
+        self.assertEqual((moved.x, moved.y), (30, 0))
+        self.assertEqual(moved.CellAt((0,0)), (30,0))
+        self.assertEqual(moved.CellAt((45,25)), (0,1))
+        self.assertEqual(viewport.Moved(0, 30).CellAt((0,0)), (0,1))
+        """ Plane: no wrapping, cells can be negative """
+        plane = ui.Viewport((640,480), (32,24), wrap=False, level=1).Moved(-40, -60)
+        self.assertEqual(plane.CellAt((0,0)), (-2,-3))
+        """ Zoom keeps cell under cursor in place """
+        viewport = ui.Viewport((640,480), (100,100), x=7, y=3, level=2)
+        for pos in ((105,57), (0,0), (639,479), (333,111)):
+            for delta in (-1, -2, 1):
+                zoomed = viewport.Zoomed(delta, pos)
+                self.assertEqual(zoomed.level, 2 + delta)
+                self.assertEqual(zoomed.CellAt(pos), viewport.CellAt(pos))
+        self.assertEqual(viewport.Zoomed(-10).level, 0)
+        self.assertEqual(viewport.Zoomed(100).level, viewport.MaxLevel)
+        if engines.np is not None:
+            # Pixel shows several cells: no single cell to click
+            self.assertIsNone(ui.Viewport((64,48), (1000,1000), level=7).CellAt((1,1)))
+    
+    """ GUI with mocked windows and renderer, viewport at 40 pixels per cell """
+    def __headlessGUI(self, game):
+        with mock.patch.object(ui, 'Tk'), mock.patch.object(ui, 'Menu'):
+            gui = ui.GUI()
+        gui.game = game
+        gui.game_settings = game.settings
+        gui.viewport = ui.Viewport((gui.width, gui.height), (game.cols, game.rows), level=0)
+        gui.renderer = mock.Mock()
+        gui.simulation = mock.Mock()
+        gui.clock = mock.Mock()
+        gui.game_in_process = True
+        return gui
+    
+    @skipIf(ui is None or engines.np is None, 'pygame or numpy is not installed')
+    def test_GridRenderer(self):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        ui.pygame.display.init()
+        self.addCleanup(ui.pygame.display.quit)
+        screen = ui.pygame.display.set_mode((160,120))
+        renderer = ui.GridRenderer(screen)
+        game = GameOfLife(size=(16,12), settings=GameSettings(players_number=1), seed=1)
+        game.Start()
+        for y in (4, 5, 6):
+            game.AddCell(1, 5, y)
+        # 10 pixels per cell: whole board fits screen
+        viewport = ui.Viewport((160,120), (16,12), level=2)
+        renderer.Reset(viewport, viewport.Capture(game), 'white')
+        self.assertEqual(renderer.dirty, [screen.get_rect()])
+        renderer.Update()
+        """ Blinker step: only 4 changed cells are repainted """
+        game.Move()
+        renderer.Draw(viewport, viewport.Capture(game))
+        cell = lambda x, y: ui.pygame.Rect(x * 10 + 1, y * 10 + 1, 9, 9)
+        self.assertEqual(sorted(map(tuple, renderer.dirty)), sorted(tuple(cell(x, y)) for x, y in ((5,4), (5,6), (4,5), (6,5))))
+        color = lambda x, y: tuple(screen.get_at((x, y)))[:3]
+        red, black, white = (tuple(ui.pygame.Color(name))[:3] for name in ('red', 'black', 'white'))
+        self.assertEqual([color(45, 55), color(55, 55), color(65, 55)], [red] * 3)
+        self.assertEqual([color(55, 45), color(55, 65)], [black] * 2)
+        self.assertEqual([color(50, 43), color(43, 50)], [white] * 2)
+        renderer.Update()
+        self.assertEqual(renderer.dirty, [])
+        """ Zoomed out: 2 cells per pixel, drawn as image over whole screen """
+        zoomed = ui.Viewport((160,120), (16,12), level=6)
+        renderer.Draw(zoomed, zoomed.Capture(game))
+        self.assertEqual(renderer.dirty, [screen.get_rect()])
+        self.assertEqual([color(2, 2), color(3, 2), color(0, 0), color(2, 3)], [red, red, black, black])
+    
+    @skipIf(ui is None, 'pygame is not installed')
+    def test_GUIViewEvents(self):
+        game = GameOfLife(size=(32,24), settings=GameSettings(players_number=1), seed=1)
+        game.Start()
+        gui = self.__headlessGUI(game)
+        drag = lambda dx: ui.pygame.event.Event(ui.MOUSEMOTION, buttons=(0, 0, 1), rel=(dx, 0), pos=(0, 0))
+        # Dragging right by 100 pixels moves view 2 cells left, 20 pixels are kept for next drag
+        gui._GUI__viewEvent(drag(100))
+        self.assertEqual((gui.viewport.x, gui.drag), (30, [-20, 0]))
+        gui._GUI__viewEvent(drag(20))
+        self.assertEqual((gui.viewport.x, gui.drag), (29, [0, 0]))
+        self.assertIs(gui.simulation.viewport, gui.viewport)
+    
+    @skipIf(ui is None, 'pygame is not installed')
+    def test_GUIMenuWhileRunning(self):
+        settings = GameSettings(players_number=1)
+        gui = self.__headlessGUI(GameOfLife(settings=settings))
+        gui.app_running = True
+        gui.screen = mock.Mock()
+        gui.ng_window = mock.Mock()
+        gui.game_params_entries = {}
+        gui.board_entries = {name: mock.Mock(**{'get.return_value': value})
+                             for name, value in (('size', '16x12'), ('engine', 'python'), ('computer', ''))}
+        updates = []
+        """ Tk runs menu commands inside root.update: 'New game' is ignored while game runs, 'Exit' ends the game loop """
+        def update():
+            updates.append(True)
+            if len(updates) == 3:
+                gui._GUI__newGamePopup()
+                gui._GUI__appQuit()
+        gui.root.update.side_effect = update
+        with mock.patch.object(ui, 'GridRenderer'), mock.patch.object(ui, 'Toplevel') as popup, \
+                mock.patch.object(ui.pygame.time, 'Clock'), mock.patch.object(ui.pygame.event, 'get', return_value=[]):
+            gui._GUI__newGame()
+        popup.assert_not_called()
+        self.assertFalse(gui.app_running or gui.game_in_process)
+        gui.simulation.join(5)
+        self.assertFalse(gui.simulation.is_alive())
+    
+    @skipIf(ui is None, 'pygame is not installed')
+    def test_GUIAddNewCells(self):
+        settings = GameSettings(players_number=1, new_cells_per_round=5)
+        game = GameOfLife(size=(16,12), settings=settings, seed=1)
+        game.Start()
+        gui = self.__headlessGUI(game)
+        Event = ui.pygame.event.Event
+        click = lambda x, y: Event(ui.MOUSEBUTTONDOWN, button=1, pos=(x * 40 + 5, y * 40 + 5))
+        key = lambda char: Event(ui.KEYDOWN, unicode=char, key=0)
+        # Two blocks: only 1 cell is left for second one
+        events = [[], [key('1')], [click(2, 2)], [click(5, 5)]]
+        with mock.patch.object(ui.pygame.event, 'get', side_effect=events):
+            gui._GUI__addNewCells()
+        self.assertEqual(gui.stamp, patterns.PATTERNS['block'])
+        self.assertEqual(game.Populations, [0, 5])
+        self.assertEqual([game.grid[y][x] for x, y in ((2,2), (3,2), (2,3), (3,3))], [1] * 4)
+        self.assertEqual(sum(game.grid[y][x] for x, y in ((5,5), (6,5), (5,6), (6,6))), 1)
+        """ 'u' takes back cells of the round (block at 0, 0), then single cells are added """
+        events = [[click(0, 0)], [key('u')], [key('0'), click(1, 1)], [click(1, 2)], [click(1, 3)], [click(1, 4)],
+                  [click(1, 5)]]
+        with mock.patch.object(ui.pygame.event, 'get', side_effect=events):
+            gui._GUI__addNewCells()
+        self.assertEqual(game.grid[0][0], 0)
+        self.assertEqual(game.Populations, [0, 10])
+    
+    def test_TileTracker(self):
+        self.__assertMatchesPythonEngine(tile_size=4)
+        self.__assertMatchesPythonEngine(size=(9,5), tile_size=4)
+        game = GameOfLife(size=(16,16), settings=GameSettings(players_number=1), tile_size=4)
+        game.Start()
+        for x in range(1, 4):
+            game.AddCell(1, x, 2)
+        game.Move()
+        # Only tiles around blinker are recalculated
+        self.assertEqual(game.tiles.Pending(1), {(0,0), (1,0), (0,1)})
+    
+    def test_HashLife(self):
+        settings = GameSettings(players_number=2, generations_per_round=13, new_cells_per_round=20)
+        expected = GameOfLife(size=(23,11), settings=settings)
+        game = GameOfLife(size=(23,11), settings=settings, hashlife=True)
+        rnd = random.Random(3)
+        grid = [[rnd.choice([0,2]) for x in range(23)] for y in range(11)]
+        for g in (expected, game):
+            g.Start()
+            g.grid = [row[:] for row in grid]
+        # Whole round in one move
+        deltas = game.Move(return_delta=True)
+        self.assertEqual(game.cur_round, 2)
+        self.assertEqual(len(deltas), 1)
+        for x, y, old, new in deltas[0][1]:
+            grid[y][x] = new
+        self.assertEqual(grid, game.grid)
+        for m in range(settings.generations_per_round):
+            expected.Move()
+        self.assertEqual(game.grid, expected.grid)
+        self.assertEqual(game.Winner, expected.Winner)
+    
+    def test_Patterns(self):
+        glider = patterns.ParseRLE('#N Glider\nx = 3, y = 3, rule = B3/S23\nbo$2bo$\n3o!')
+        self.assertEqual((glider.name, glider.cells, glider.width, glider.height),
+                        ('Glider', ((0,2), (1,0), (1,2), (2,1), (2,2)), 3, 3))
+        self.assertEqual([len(patterns.PATTERNS[name].Variants()) for name in ('glider', 'block', 'blinker')], [8, 1, 2])
+        self.assertIs(glider.Variants(), glider.Variants())
+        path = os.path.join(tempfile.mkdtemp(), 'pond.rle')
+        with open(path, 'w') as f:
+            f.write('x = 4, y = 4\nb2ob$o2bo$o2bo$b2o!\n')
+        self.assertEqual((patterns.LoadRLE(path).name, len(patterns.LoadRLE(path))), ('pond', 8))
+        engine_names = ['python', 'bitboard', 'sparse'] + (['numpy'] if engines.np is not None else [])
+        for engine in engine_names:
+            game = GameOfLife(size=(5,4), engine=engine)
+            game.Start()
+            game.AddCell(2, 0, 0)
+            """ Pattern wraps around, occupied cell is skipped, limit is respected """
+            self.assertEqual(game.AddPattern(1, patterns.PATTERNS['block'], 4, 3), 3)
+            self.assertEqual([game.grid[y][x] for x, y in ((4,3), (0,3), (4,0), (0,0))], [1, 1, 1, 2])
+            added = []
+            self.assertEqual(game.AddPattern(1, glider, 1, 0, limit=2, added=added), 2)
+            self.assertEqual(added, [(1,2), (2,0)])
+            self.assertEqual(game.Populations, [0, 5, 1])
+    
+    def test_BatchPlayGame(self):
+        config = {'size': (12,10), 'players': 3, 'rounds': 3, 'generations': 4, 'cells': 10,
+                'policies': ['random', 'clustered', 'pattern']}
+        result = batch.PlayGame(config, 0, 42)
+        self.assertEqual(len(result['rounds']), 3)
+        self.assertEqual(len(result['rounds'][0]), 3)
+        self.assertEqual(result['policies'], ['random', 'clustered', 'pattern'])
+        # Same seed - same game
+        again = batch.PlayGame(config, 0, 42)
+        self.assertEqual((again['rounds'], again['winner']), (result['rounds'], result['winner']))
+        # Pool workers can not have rollout processes
+        with mock.patch('sys.stderr'), self.assertRaises(SystemExit):
+            batch.main(['--processes', '2', '--ai-workers', '2', '--policy', 'montecarlo'])
+    
+    @skipIf(engines.np is None, 'numpy is not installed')
+    def test_MonteCarloPolicy(self):
+        settings = GameSettings(players_number=2, rounds_number=3, generations_per_round=8, new_cells_per_round=10)
+        placed = []
+        for workers in (0, 0, 2):
+            game = GameOfLife(size=(16,12), settings=settings, seed=3)
+            game.Start()
+            game.players_queue = [1, 2]
+            policy = ai.MonteCarloPolicy(budget=60, workers=workers, candidates=4, rollouts=8)
+            try:
+                self.assertEqual(policy.Place(game, 1, 10, random.Random(5)), 10)
+            finally:
+                policy.Close()
+            self.assertEqual(policy.played, 8)
+            self.assertEqual(game.Populations, [0, 10, 0])
+            placed.append(game.grid)
+        # Rollouts do not depend on process they are made in
+        self.assertEqual(placed[0], placed[1])
+        self.assertEqual(placed[0], placed[2])
+        """ Stronger than random placement """
+        config = {'size': (16,12), 'players': 2, 'rounds': 3, 'generations': 8, 'cells': 10,
+                'policies': ['montecarlo', 'random'], 'ai_budget': 0.05}
+        self.assertEqual(batch.PlayGame(config, 0, 1)['winner'], 'Winner: player 1')
+    
+    def test_Replay(self):
+        path = os.path.join(tempfile.mkdtemp(), 'games.pgr')
+        games = []
+        for seed in (1, 2):
+            settings = GameSettings(players_number=3, rounds_number=3, generations_per_round=5,
+                                    rules='B3/S23' if seed == 1 else 'B36/S23;B3/S23', simultaneous=seed == 2)
+            game = GameOfLife(size=(15,11), settings=settings, seed=seed)
+            writer = replay.ReplayWriter(path, game, keyframe_every=5)
+            policy = batch.PatternPolicy()
+            rnd = random.Random(seed)
+            game.Start()
+            while not game.IsOver:
+                if game.cur_round_generation == 1:
+                    for p in game.players_queue:
+                        policy.Place(writer, p, game.settings.new_cells_per_round, rnd)
+                writer.Move()
+            writer.Close()
+            games.append(game)
+        for game in (GameOfLife(engine='plane'), GameOfLife(seed=-1)):
+            with self.assertRaises(ValueError):
+                replay.ReplayWriter(path, game)
+        reader = replay.ReplayReader(path)
+        replays = list(reader.Games())
+        self.assertEqual(len(replays), 2)
+        for game, recorded in zip(games, replays):
+            self.assertEqual(recorded.seed, game.seed)
+            self.assertEqual(len(recorded.keyframes), 3)
+            self.assertEqual((recorded.settings.rules, recorded.settings.simultaneous),
+                            (game.settings.rules, game.settings.simultaneous))
+            frames = {}
+            for played in recorded.Play():
+                frames[(played.cur_round, played.cur_round_generation)] = [row[:] for row in played.grid]
+            self.assertEqual(played.grid, game.grid)
+            self.assertEqual(played.Winner, game.Winner)
+            # Random access: backwards, forwards, past keyframes and from cache
+            for key in [(4,1), (2,3), (1,2), (3,5), (2,4), (2,3), (3,2)]:
+                self.assertEqual([list(row) for row in recorded.Frame(*key)], frames[key])
+        reader.Close()
+        """ Keyframes follow generations, not moves: with cycles one move plays the rest of round """
+        path = os.path.join(tempfile.mkdtemp(), 'cycles.pgr')
+        settings = GameSettings(players_number=1, rounds_number=2, generations_per_round=20)
+        game = GameOfLife(size=(12,10), settings=settings, seed=1, cycles=True)
+        writer = replay.ReplayWriter(path, game, keyframe_every=3)
+        game.Start()
+        # Block and blinker: grid repeats after 2 generations
+        for x, y in ((2,2), (3,2), (2,3), (6,6), (7,6), (8,6)):
+            writer.AddCell(1, x, y)
+        while not game.IsOver:
+            writer.Move()
+        writer.Close()
+        reader = replay.ReplayReader(path)
+        recorded = next(reader.Games())
+        self.assertEqual(sorted(recorded.keyframes), [20, 21, 40])
+        frames = {(played.cur_round, played.cur_round_generation): [row[:] for row in played.grid]
+                  for played in recorded.Play()}
+        for key in [(2,5), (2,1), (1,15)]:
+            self.assertEqual([list(row) for row in recorded.Frame(*key)], frames[key])
+        reader.Close()
+    
+    def test_GameServer(self):
+        from pygol.asgi import application
+        asyncio.run(self.__playServerGame(application))
+    
+    async def __playServerGame(self, application):
+        server.application.speed = 0
+        first, second = server.LocalClient(application), server.LocalClient(application)
+        self.assertTrue(await first.Connect())
+        self.assertTrue(await second.Connect())
+        join = {'action': 'join', 'game': 'test', 'size': [8,8],
+                'settings': {'players_number': 2, 'generations_per_round': 3, 'rounds_number': 1, 'new_cells_per_round': 5}}
+        await first.Send(join)
+        state = await first.Receive()
+        self.assertEqual((state['type'], state['cols'], state['placing'], state['player']), ('state', 8, True, 1))
+        await second.Send(join)
+        self.assertEqual((await second.Receive())['player'], 2)
+        # Players are assigned on join, others watch; client can not pick size of any board
+        third = server.LocalClient(application)
+        self.assertTrue(await third.Connect())
+        await third.Send(join)
+        self.assertEqual((await third.Receive())['player'], None)
+        await third.Send({'action': 'ready'})
+        self.assertEqual((await third.Receive())['type'], 'error')
+        await third.Send(dict(join, game='huge', size=[100000, 100000]))
+        self.assertEqual((await third.Receive())['type'], 'error')
+        await third.Disconnect()
+        self.assertNotIn('huge', server.application.rooms)
+        await second.Send({'action': 'add', 'player': 1, 'x': 0, 'y': 0})
+        self.assertEqual((await second.Receive())['type'], 'error')
+        """ Client whose connection is broken leaves room, others still get messages """
+        async def broken(event):
+            raise ConnectionResetError('connection lost')
+        room = server.application.rooms['test']
+        room.connections.add(broken)
+        # Blinker of player 1
+        for x in range(2, 5):
+            await first.Send({'action': 'add', 'player': 1, 'x': x, 'y': 3})
+            for client in (first, second):
+                self.assertEqual((await client.Receive())['changes'], [[x, 3, 1]])
+        await first.Send({'action': 'add', 'player': 1, 'x': 2, 'y': 3})
+        self.assertEqual((await first.Receive())['type'], 'error')
+        self.assertNotIn(broken, room.connections)
+        room.connections.add(broken)
+        await first.Send({'action': 'ready', 'player': 1})
+        await second.Send({'action': 'ready'})
+        generation = await second.Receive()
+        self.assertEqual(generation['generation'], 1)
+        self.assertEqual(sorted(generation['changes']), [[2,3,0], [3,2,1], [3,4,1], [4,3,0]])
+        for g in (2, 3):
+            self.assertEqual((await second.Receive())['generation'], g)
+        result = await second.Receive()
+        self.assertEqual((result['type'], result['populations'], result['over']), ('round', [0,3,0], True))
+        self.assertNotIn(broken, room.connections)
+        await first.Disconnect()
+        await second.Disconnect()
+        self.assertNotIn('test', server.application.rooms)
+    
+    def test_Bench(self):
+        result = {'engine': 'python', 'size': '30x20', 'players': 2, 'profile': 'gliders'}
+        result['metrics'] = bench.RunCase('python', (30,20), 2, 'gliders', generations=2)
+        self.assertGreater(result['metrics']['cells_per_second'], 0)
+        slower = dict(result, metrics={m: v * 0.5 for m, v in result['metrics'].items()})
+        self.assertEqual(bench.Compare([result], [slower]), [])
+        regressions = bench.Compare([slower], [result], threshold=0.2)
+        self.assertEqual(len(regressions), len(result['metrics']))
+    
+    
+    def test_Profiler(self):
+        profiler = profiling.Profiler()
+        self.__assertMatchesPythonEngine(profiler=profiler)
+        phases = {s['phase']: s for s in profiler.Summary()}
+        self.assertEqual(phases['move']['count'], 10)
+        self.assertEqual(phases['player_move']['count'], 40)
+        for phase in ('allocation', 'neighbors', 'rules'):
+            self.assertEqual(phases[phase]['count'], 40)
+        self.assertEqual(sum(n for (counter, p, r), n in profiler.counters.items() if counter == 'cells_evaluated'), 40 * 17 * 13)
+        """ Records are kept per player and round """
+        self.assertIn(('player_move', 3, 1), profiler.histograms)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'profile.jsonl')
+            sink = profiling.JsonLinesSink(path)
+            profiler = profiling.Profiler(sink)
+            profiler.Add('draw_grid', 0.002, 0, 1)
+            sink.Close()
+            with open(path) as f:
+                self.assertEqual(json.loads(f.read()), {'phase': 'draw_grid', 'seconds': 0.002, 'player': 0, 'round': 1})
+    
+    
+    def test_GameLogger(self):
+        games = [GameOfLife(size=(8,8), settings=GameSettings(players_number=1, generations_per_round=2, rounds_number=1),
+                            round_events=True) for i in range(3)]
+        self.assertEqual(len(games[0].logger.handlers), 1)
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        games[0].logger.addHandler(handler)
+        try:
+            game = games[0]
+            game.Start()
+            game.grid = [[1 if y == 1 and x < 3 else 0 for x in range(8)] for y in range(8)]
+            while not game.IsOver:
+                game.Move()
+        finally:
+            game.logger.removeHandler(handler)
+        events = [json.loads(r.getMessage()) for r in records if r.getMessage().startswith('{')]
+        self.assertEqual(len(events), 1)
+        self.assertEqual((events[0]['round'], events[0]['populations']), (1, [3]))
+        self.assertGreaterEqual(events[0]['elapsed'], 0)
+    
+    
+    """ Game with given options must give exactly the same grid as plain python one, move by move """
+    def __assertMatchesPythonEngine(self, size=(17,13), moves=10, rules='B3/S23', simultaneous=False, **options):
+        settings = GameSettings(players_number=4, new_cells_per_round=20, rules=rules, simultaneous=simultaneous)
+        expected = GameOfLife(size=size, settings=settings)
+        game = GameOfLife(size=size, settings=settings, **options)
+        rnd = random.Random(7)
+        grid = [[rnd.choice([0,0,1,2,3,4]) for x in range(size[0])] for y in range(size[1])]
+        for g in (expected, game):
+            g.Start()
+            g.players_queue = [3,1,4,2]
+            g.grid = [row[:] for row in grid]
+        for x, y in ((0,0), (size[0] - 1, size[1] - 1), (5 % size[0], 2 % size[1])):
+            self.assertEqual(game.AddCell(1, x, y), expected.AddCell(1, x, y))
+        for m in range(moves):
+            before = [row[:] for row in expected.grid]
+            expected_deltas = expected.Move(return_delta=True)
+            deltas = game.Move(return_delta=True)
+            self.assertEqual([(p, sorted(changes)) for p, changes in deltas],
+                            [(p, sorted(changes)) for p, changes in expected_deltas])
+            # Deltas lead from previous grid to current one
+            for p, changes in deltas:
+                for x, y, old, new in changes:
+                    self.assertEqual(before[y][x], old)
+                    before[y][x] = new
+            self.assertEqual(before, expected.grid)
+            self.assertEqual([[int(c) for c in row] for row in game.grid], expected.grid)
+            self.assertEqual(game.Populations, self.__countCells(expected))
+            self.assertEqual(expected.Populations, self.__countCells(expected))
+        self.assertEqual(game.Winner, expected.Winner)
+    
+    def __countCells(self, game):
+        counts = [0] * (game.settings.players_number + 1)
+        for row in game.grid:
+            for c in row:
+                if c > 0:
+                    counts[c] += 1
+        return counts
     
     def __setManualGrid(self):
         self.game.grid = [
@@ -1,15 +1,344 @@
 """ UI module """
 
 import os
+import queue
+import random
+import threading
+import time
+from collections import namedtuple
 import pygame
-from pygame.locals import MOUSEBUTTONDOWN, QUIT
+from pygame.locals import (MOUSEBUTTONDOWN, MOUSEMOTION, MOUSEWHEEL, KEYDOWN, QUIT,
+                           K_LEFT, K_RIGHT, K_UP, K_DOWN, K_PLUS, K_EQUALS, K_KP_PLUS, K_MINUS, K_KP_MINUS)
 from tkinter import Tk, Menu, Frame, Toplevel, Label, Entry, Button
-from logic import GameSettings, GameOfLife
+try:
+    from . import ai, engines, patterns
+    from .logic import GameSettings, GameOfLife
+except ImportError:
+    import ai
+    import engines
+    import patterns
+    from logic import GameSettings, GameOfLife
+np = engines.np
+
+""" Zoom levels: (pixels per cell, cells per pixel) """
+ZOOM_LEVELS = ((40, 1), (20, 1), (10, 1), (5, 1), (2, 1), (1, 1), (1, 2), (1, 4), (1, 8), (1, 16), (1, 64), (1, 256))
+""" Smaller cells are drawn as image, without lines (needs numpy) """
+DETAIL_CELL_SIZE = 4
+
+
+""" Part of board shown in window (immutable: moving or zooming gives new viewport) """
+class Viewport:
+    __slots__ = ('width', 'height', 'cols', 'rows', 'wrap', 'x', 'y', 'level')
+    # Cells per block side looked at when zoomed out on dense grid
+    SAMPLES = 2
+
+    """ wrap: board is toroidal (x, y of top left cell are kept inside board), otherwise unbounded plane """
+    def __init__(self, screen_size: (int, int), board_size: (int, int), wrap: bool=True, x: int=0, y: int=0, level: int=1):
+        self.width, self.height = screen_size
+        self.cols, self.rows = board_size
+        self.wrap = wrap
+        self.x, self.y = (x % self.cols, y % self.rows) if wrap else (x, y)
+        self.level = level
+
+    """ Most detailed level showing whole board (or the least detailed one available) """
+    @classmethod
+    def Fitting(cls, screen_size: (int, int), board_size: (int, int), wrap: bool=True):
+        viewport = cls(screen_size, board_size, wrap)
+        for level in range(viewport.MaxLevel + 1):
+            viewport = cls(screen_size, board_size, wrap, level=level)
+            if viewport.Columns >= viewport.cols and viewport.Rows >= viewport.rows:
+                break
+        return viewport
+
+    @property
+    def cell_size(self) -> int:
+        return ZOOM_LEVELS[self.level][0]
+
+    @property
+    def step(self) -> int:
+        return ZOOM_LEVELS[self.level][1]
+
+    """ Cells are drawn one by one over lines """
+    @property
+    def Detailed(self) -> bool:
+        return self.cell_size >= DETAIL_CELL_SIZE
+
+    """ Number of board columns shown """
+    @property
+    def Columns(self) -> int:
+        return -(-self.width // self.cell_size) * self.step
+
+    """ Number of board rows shown """
+    @property
+    def Rows(self) -> int:
+        return -(-self.height // self.cell_size) * self.step
+
+    """ Least detailed level that can be used: whole toroidal board is already seen on it """
+    @property
+    def MaxLevel(self) -> int:
+        levels = len(ZOOM_LEVELS) if np is not None else sum(1 for size, step in ZOOM_LEVELS if size >= DETAIL_CELL_SIZE)
+        for level in range(levels):
+            size, step = ZOOM_LEVELS[level]
+            if self.wrap and -(-self.width // size) * step >= self.cols and -(-self.height // size) * step >= self.rows:
+                return level
+        return levels - 1
+
+    """ Viewport moved by given number of pixels """
+    def Moved(self, dx: int, dy: int) -> 'Viewport':
+        return Viewport((self.width, self.height), (self.cols, self.rows), self.wrap,
+                        self.x + dx * self.step // self.cell_size, self.y + dy * self.step // self.cell_size, self.level)
+
+    """ Viewport zoomed out (delta > 0) or in (delta < 0), cell at pos stays in place """
+    def Zoomed(self, delta: int, pos: (int, int)=None) -> 'Viewport':
+        level = max(0, min(self.MaxLevel, self.level + delta))
+        px, py = pos if pos is not None else (self.width // 2, self.height // 2)
+        size, step = ZOOM_LEVELS[level]
+        x = self.x + px * self.step // self.cell_size - px * step // size
+        y = self.y + py * self.step // self.cell_size - py * step // size
+        return Viewport((self.width, self.height), (self.cols, self.rows), self.wrap, x, y, level)
+
+    """ Board cell (x, y) at window position (None if one pixel shows several cells) """
+    def CellAt(self, pos: (int, int)) -> (int, int):
+        if self.step > 1:
+            return None
+        x, y = self.x + pos[0] // self.cell_size, self.y + pos[1] // self.cell_size
+        return (x % self.cols, y % self.rows) if self.wrap else (x, y)
+
+    """
+        Visible part of game's grid: list of rows of cells when detailed,
+        otherwise image (numpy array, pixel per value) of dominant players of cell blocks shown by pixels
+    """
+    def Capture(self, game: GameOfLife):
+        if not self.Detailed:
+            return self.__image(game)
+        grid = game.grid
+        xs = self.__indexes(self.x, range(self.Columns), self.cols)
+        return [[row[x] for x in xs] for row in (grid[y] for y in self.__indexes(self.y, range(self.Rows), self.rows))]
+
+    """ Board indexes at given offsets from start """
+    def __indexes(self, start: int, offsets, size: int) -> list:
+        return [(start + d) % size for d in offsets] if self.wrap else [start + d for d in offsets]
+
+    def __image(self, game: GameOfLife):
+        width, height = -(-self.width // self.cell_size), -(-self.height // self.cell_size)
+        step = self.step
+        players = game.settings.players_number
+        cells = getattr(game.engine, 'cells', None)
+        if cells is not None:
+            """ Sparse engines: live cells are binned into pixels """
+            counts = np.zeros((players + 1, height, width), dtype=np.int32)
+            if cells:
+                live = np.array([(x, y, p) for (x, y), p in cells.items()], dtype=np.int64)
+                dx, dy = live[:, 0] - self.x, live[:, 1] - self.y
+                if self.wrap:
+                    dx %= self.cols
+                    dy %= self.rows
+                inside = (dx >= 0) & (dx < width * step) & (dy >= 0) & (dy < height * step)
+                np.add.at(counts, (live[inside, 2], dy[inside] // step, dx[inside] // step), 1)
+        else:
+            """ Dense grids: up to SAMPLES x SAMPLES cells of each block are looked at, so cost depends on window size only """
+            grid = game.grid
+            samples = min(step, self.SAMPLES)
+            offsets = [i * step + j * (step // samples) for i in range(max(width, height)) for j in range(samples)]
+            xs = self.__indexes(self.x, offsets[:width * samples], self.cols)
+            ys = self.__indexes(self.y, offsets[:height * samples], self.rows)
+            if isinstance(grid, np.ndarray):
+                region = grid[np.ix_(ys, xs)]
+            else:
+                region = np.array([[row[x] for x in xs] for row in (grid[y] for y in ys)], dtype=np.uint8)
+            if samples == 1:
+                return region
+            counts = np.zeros((players + 1, height, width), dtype=np.uint8)
+            for i in range(samples):
+                for j in range(samples):
+                    sampled = region[i::samples, j::samples]
+                    for p in range(1, players + 1):
+                        counts[p] += sampled == p
+        image = counts[1:].argmax(axis=0).astype(np.uint8) + 1
+        image[counts[1:].max(axis=0) == 0] = 0
+        return image
+
+
+""" Grid renderer: detailed view repaints only changed cells over cached lines layer, zoomed out view is blitted image """
+class GridRenderer:
+    """ 0 = Dead, 1-5 = Player cell """
+    colors = ['black', 'red', 'green', 'blue', 'yellow', 'purple']
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.palette = np.array([tuple(pygame.Color(name))[:3] for name in self.colors], dtype=np.uint8) if np is not None else None
+        # Cell size -> cell surfaces (they fit inside lines)
+        self.cells = {}
+        # (cell size, color) -> lines layer
+        self.layers = {}
+        self.lines = 'black'
+        self.viewport = None
+        self.shown = []
+        self.dirty = []
+
+    """ Repaint everything in given viewport """
+    def Reset(self, viewport: Viewport, frame, lines: str=None):
+        if lines is not None:
+            self.lines = lines
+        self.viewport = viewport
+        if viewport.Detailed:
+            self.screen.blit(self.__linesLayer(viewport.cell_size, self.lines), (0, 0))
+            self.shown = [[0] * len(row) for row in frame]
+            self.__drawCells(frame)
+        else:
+            self.__drawImage(frame)
+        self.dirty = [self.screen.get_rect()]
+
+    """ Paint frame captured by viewport (only cells that differ from shown ones, unless viewport changed) """
+    def Draw(self, viewport: Viewport, frame):
+        if viewport is not self.viewport:
+            self.Reset(viewport, frame)
+        elif viewport.Detailed:
+            self.__drawCells(frame)
+        else:
+            self.__drawImage(frame)
+            self.dirty = [self.screen.get_rect()]
+
+    """ Push changed areas to display """
+    def Update(self):
+        if self.dirty:
+            pygame.display.update(self.dirty)
+            self.dirty = []
+
+    def __drawCells(self, frame):
+        size = self.viewport.cell_size
+        surfaces = self.__cellSurfaces(size)
+        for y, row in enumerate(frame):
+            shown = self.shown[y]
+            for x, player in enumerate(row):
+                if shown[x] != player:
+                    shown[x] = player
+                    self.dirty.append(self.screen.blit(surfaces[player], (x * size + 1, y * size + 1)))
+
+    """ One pixel per value of image, scaled up to cell size """
+    def __drawImage(self, image):
+        surface = pygame.surfarray.make_surface(self.palette[image].transpose(1, 0, 2))
+        size = self.viewport.cell_size
+        if size > 1:
+            surface = pygame.transform.scale(surface, (surface.get_width() * size, surface.get_height() * size))
+        self.screen.fill(pygame.Color('black'))
+        self.screen.blit(surface, (0, 0))
+
+    def __cellSurfaces(self, size: int) -> list:
+        if size not in self.cells:
+            self.cells[size] = []
+            for name in self.colors:
+                surface = pygame.Surface((size - 1, size - 1))
+                surface.fill(pygame.Color(name))
+                self.cells[size].append(surface)
+        return self.cells[size]
+
+    """ Background with lines outlining cells """
+    def __linesLayer(self, size: int, color: str):
+        if (size, color) not in self.layers:
+            width, height = self.screen.get_size()
+            layer = pygame.Surface((width, height))
+            layer.fill(pygame.Color('black'))
+            for x in range(0, width, size):
+                pygame.draw.line(layer, pygame.Color(color), (x, 0), (x, height))
+            for y in range(0, height, size):
+                pygame.draw.line(layer, pygame.Color(color), (0, y), (width, y))
+            self.layers[(size, color)] = layer.convert()
+        return self.layers[(size, color)]
+
+
+""" Grid state published by simulation: frame captured by viewport after generation """
+Snapshot = namedtuple('Snapshot', ('frame', 'viewport', 'round', 'generation'))
+
+
+""" Game simulation in background thread, publishing snapshots through bounded queue """
+class Simulation(threading.Thread):
+
+    def __init__(self, game: GameOfLife, viewport: Viewport, speed: int=10, queue_size: int=2):
+        super().__init__(daemon=True)
+        self.game = game
+        # Snapshots capture only what is shown, GUI replaces viewport when it is moved or zoomed
+        self.viewport = viewport
+        # Generations per second, 0 = as fast as engine allows
+        self.speed = speed
+        self.snapshots = queue.Queue(queue_size)
+        self.waiting_cells = threading.Event()
+        self.resume = threading.Event()
+        # Held while game changes
+        self.lock = threading.Lock()
+        self.running = True
+    
+    def run(self):
+        next_move = time.perf_counter()
+        while self.running and not self.game.IsOver:
+            """ On start of every new round players need to add cells: wait for GUI """
+            if self.game.cur_round_generation == 1:
+                self.waiting_cells.set()
+                self.resume.wait()
+                self.resume.clear()
+                if not self.running:
+                    return
+                next_move = time.perf_counter()
+            with self.lock:
+                self.game.Move()
+                snapshot = self.__snapshot()
+            self.__publish(snapshot)
+            if self.speed > 0:
+                next_move += 1 / self.speed
+                time.sleep(max(0, next_move - time.perf_counter()))
+    
+    """ Players added cells, continue round """
+    def Resume(self):
+        self.waiting_cells.clear()
+        self.resume.set()
+    
+    """ Stop simulation (game is abandoned) """
+    def Stop(self):
+        self.running = False
+        self.resume.set()
+    
+    """ Capture game grid by viewport between moves """
+    def Capture(self, viewport: Viewport):
+        with self.lock:
+            return viewport.Capture(self.game)
+    
+    """ Latest published snapshot (None if nothing new) """
+    def Latest(self):
+        latest = None
+        while True:
+            try:
+                latest = self.snapshots.get_nowait()
+            except queue.Empty:
+                return latest
+    
+    """ True when game is over and every snapshot was taken """
+    @property
+    def Finished(self) -> bool:
+        return not self.is_alive() and self.snapshots.empty()
+    
+    def __snapshot(self) -> Snapshot:
+        game = self.game
+        viewport = self.viewport
+        return Snapshot(viewport.Capture(game), viewport, game.cur_round, game.cur_round_generation)
+    
+    """ Put snapshot to queue, dropping oldest one if renderer falls behind """
+    def __publish(self, snapshot: Snapshot):
+        while True:
+            try:
+                self.snapshots.put_nowait(snapshot)
+                return
+            except queue.Full:
+                try:
+                    self.snapshots.get_nowait()
+                except queue.Empty:
+                    pass
+
 
 """ GUI class """
 class GUI():
 
-    def __init__(self):
+    """ profiler: optional profiling.Profiler timing game phases and drawing """
+    def __init__(self, profiler=None):
         self.width = 640
         self.height = 480
         self.root = Tk()
@@ -18,12 +347,33 @@ class GUI():
         menu = Menu(self.root)
         menu.add_command(label='New game', command=self.__newGamePopup)
         menu.add_command(label='Exit', command=self.__appQuit)
+        menu.add_command(label='Max speed', command=self.__toggleSpeed)
+        self.speed_index = menu.index('end')
         # Space to separate status. Not the most elegant solution, I know
         menu.add_command(label='                ')
         # Status label
         menu.add_command(label=' ')
+        self.status_index = menu.index('end')
         self.root.config(menu=menu)
         self.menu = menu
+        self.speed = 10
+        self.fps = 30
+        self.max_speed = False
+        self.simulation = None
+        self.profiler = profiler
+        # Board is not bound to window: it is seen through viewport
+        self.board_size = (32, 24)
+        self.engine = 'python'
+        self.viewport = None
+        # Right button drag: pixels moved, not yet making whole cells
+        self.drag = [0, 0]
+        # Pattern added on click (None = single cell)
+        self.stamp = None
+        # Players placing cells by Monte Carlo player (ai module), it thinks for ai_budget seconds
+        self.computer = set()
+        self.ai = None
+        self.ai_budget = 1.0
+        self.rnd = random.Random()
     
     """ Run application """
     def Run(self):
@@ -41,6 +391,8 @@ class GUI():
         while self.app_running:
             self.root.update_idletasks()
             self.root.update()
+        pygame.quit()
+        self.root.destroy()
     
 
     """ Popup for new game settings setup """
@@ -59,6 +411,17 @@ class GUI():
             param_entry.insert(0, self.game_settings.__getattribute__(param))
             self.game_params_entries[param] = param_entry
             grid_row += 1
+        """ Board options are not game settings """
+        self.board_entries = {}
+        for name, label, value in (('size', 'Board size (COLSxROWS)', '{}x{}'.format(*self.board_size)),
+                                   ('engine', 'Engine ({})'.format(', '.join(['python'] + sorted(engines.ENGINES))), self.engine),
+                                   ('computer', 'Computer players (e.g. 2 3)', ' '.join(str(p) for p in sorted(self.computer)))):
+            Label(self.ng_window, text = label).grid(row = grid_row, column = 0)
+            entry = Entry(self.ng_window)
+            entry.grid(row = grid_row, column = 1)
+            entry.insert(0, value)
+            self.board_entries[name] = entry
+            grid_row += 1
         Button(self.ng_window, text="Start", command=self.__newGame).grid(row = grid_row, column = 0)
         Button(self.ng_window, text="Close", command=self.ng_window.destroy).grid(row = grid_row, column = 1)
     
@@ -69,94 +432,190 @@ class GUI():
         self.__setStatus('New game started')
         self.clock = pygame.time.Clock()
         self.ng_window.destroy()
-        self.__drawLines()
         self.game.Start()
-        self.__drawGrid()
+        self.__timed('draw_lines', self.renderer.Reset, self.viewport, self.viewport.Capture(self.game), 'black')
+        self.__refreshFrame()
+        self.simulation = Simulation(self.game, self.viewport, 0 if self.max_speed else self.speed)
+        self.simulation.start()
         self.game_in_process = True
         while self.game_in_process:
-            """ On start of every new round players need to add cells """
-            if self.game.cur_round_generation == 1:
+            """ On start of every new round players need to add cells (simulation waits for it) """
+            if self.simulation.waiting_cells.is_set():
+                # Grid is already up to date, older snapshots are not needed
+                self.simulation.Latest()
                 self.__addNewCells()
+                if not self.game_in_process:
+                    return
                 self.__setStatus('Round {}'.format(self.game.cur_round))
+                self.simulation.Resume()
             for event in pygame.event.get():
                 if event.type == QUIT:
                     self.__appQuit()
                     return
-            self.game.Move()
-            self.game_in_process = not self.game.IsOver
-            self.__drawGrid()
-            self.__drawLines()
+                self.__viewEvent(event)
+            """ Render at display rate whatever simulation has done by now (snapshots of old viewport are skipped) """
+            snapshot = self.simulation.Latest()
+            if snapshot is not None and snapshot.viewport is self.viewport:
+                self.__timed('draw_grid', self.renderer.Draw, snapshot.viewport, snapshot.frame)
             self.__refreshFrame()
-        self.__setStatus(self.game.Winner)
+            if self.simulation.Finished:
+                self.game_in_process = False
+                self.__setStatus(self.game.Winner)
     
     """ Set game settings from popup """
     def __setGameSettings(self):
         for param in self.game_params_entries:
             self.game_settings.__setattr__(param, self.game_params_entries[param].get())
+        """ Invalid board options are ignored, as invalid settings are """
+        try:
+            cols, rows = (int(v) for v in self.board_entries['size'].get().lower().split('x'))
+            if cols > 0 and rows > 0:
+                self.board_size = (cols, rows)
+        except ValueError:
+            pass
+        engine = self.board_entries['engine'].get().strip()
+        if engine == 'python' or engine in engines.ENGINES:
+            self.engine = engine
+        try:
+            self.computer = {int(p) for p in self.board_entries['computer'].get().replace(',', ' ').split()}
+        except ValueError:
+            pass
     
     """ Create new app game """
     def __setupNewGame(self):
-        self.cell_size = 20
-        self.speed = 10
-        self.game = GameOfLife(size=(int(self.width / self.cell_size), int(self.height / self.cell_size)), settings=self.game_settings)
-    
-    """ Draw lines to outline cells """
-    def __drawLines(self, color_is_white: bool=False):
-        color = pygame.Color('white') if color_is_white else pygame.Color('black')
-        for x in range(0, self.width, self.cell_size):
-            pygame.draw.line(self.screen, color, (x, 0), (x, self.height))
-        for y in range(0, self.height, self.cell_size):
-            pygame.draw.line(self.screen, color, (0, y), (self.width, y))
-    
-    """ Paint game grid to show its current state """
-    def __drawGrid(self):
-        for y in range(self.game.rows):
-            for x in range(self.game.cols):
-                self.__drawCell(self.game.grid[y][x], x, y)
-    
-    """ Draw cell for player """
-    def __drawCell(self, player, x, y):
-        pygame.draw.rect(self.screen,
-                        self.__getCellColor(player),
-                        (x*self.cell_size, y*self.cell_size, self.cell_size, self.cell_size))
-    
-    """ Get cell color, depending on its state """
-    def __getCellColor(self, cell_value):
-        """ 0 = Dead, 1-5 = Player cell """
-        colors = ['black', 'red', 'green', 'blue', 'yellow', 'purple']
-        return pygame.Color(colors[cell_value])
-    
-    """ Exit application """
+        self.simulation = None
+        if self.ai is None and self.computer and np is not None:
+            self.ai = ai.MonteCarloPolicy(budget=self.ai_budget, workers=os.cpu_count())
+        self.game = GameOfLife(size=self.board_size,
+                            settings=self.game_settings,
+                            engine=self.engine,
+                            tile_size=8 if self.engine == 'python' else 0,
+                            profiler=self.profiler)
+        self.viewport = Viewport.Fitting((self.width, self.height), self.board_size, self.engine != 'plane')
+        self.renderer = GridRenderer(self.screen)
+    
+    """ Move or zoom viewport on arrow keys, +/-, mouse wheel and right button drag """
+    def __viewEvent(self, event):
+        viewport = None
+        if event.type == KEYDOWN:
+            step_x, step_y = self.width // 4, self.height // 4
+            moves = {K_LEFT: (-step_x, 0), K_RIGHT: (step_x, 0), K_UP: (0, -step_y), K_DOWN: (0, step_y)}
+            if event.key in moves:
+                viewport = self.viewport.Moved(*moves[event.key])
+            elif event.key in (K_PLUS, K_EQUALS, K_KP_PLUS):
+                viewport = self.viewport.Zoomed(-1)
+            elif event.key in (K_MINUS, K_KP_MINUS):
+                viewport = self.viewport.Zoomed(1)
+        elif event.type == MOUSEWHEEL and event.y != 0:
+            viewport = self.viewport.Zoomed(-1 if event.y > 0 else 1, pygame.mouse.get_pos())
+        elif event.type == MOUSEMOTION and event.buttons[2]:
+            """ Dragged pixels are kept until they make whole cells """
+            size = self.viewport.cell_size
+            self.drag = [self.drag[0] - event.rel[0], self.drag[1] - event.rel[1]]
+            dx, dy = int(self.drag[0] / size) * size, int(self.drag[1] / size) * size
+            self.drag = [self.drag[0] - dx, self.drag[1] - dy]
+            viewport = self.viewport.Moved(dx, dy)
+        if viewport is None or (viewport.x, viewport.y, viewport.level) == (self.viewport.x, self.viewport.y, self.viewport.level):
+            return
+        self.viewport = viewport
+        if self.simulation is not None:
+            self.simulation.viewport = viewport
+        self.__showBoard()
+    
+    """ Paint current game grid in viewport (between moves) """
+    def __showBoard(self):
+        frame = self.simulation.Capture(self.viewport) if self.simulation is not None else self.viewport.Capture(self.game)
+        self.__timed('draw_grid', self.renderer.Draw, self.viewport, frame)
+    
+    """ Switch between normal and max simulation speed """
+    def __toggleSpeed(self):
+        self.max_speed = not self.max_speed
+        self.menu.entryconfigure(self.speed_index, label='Normal speed' if self.max_speed else 'Max speed')
+        if self.simulation is not None:
+            self.simulation.speed = 0 if self.max_speed else self.speed
+    
+    """ Exit application (pygame is closed when main loop ends) """
     def __appQuit(self):
         self.app_running = False
         self.game_in_process = False
-        pygame.quit()
+        if self.simulation is not None:
+            self.simulation.Stop()
+        if self.ai is not None:
+            self.ai.Close()
     
     """ Adding cells cycle """
     def __addNewCells(self):
-        self.__drawLines(True)
+        self.__timed('draw_lines', self.renderer.Reset, self.viewport, self.simulation.Capture(self.viewport), 'white')
         for p in self.game.players_queue:
+            if p in self.computer and self.ai is not None and self.game_in_process:
+                self.__setStatus('Round {}. Player {} (computer) is thinking'.format(self.game.cur_round, p))
+                self.__refreshFrame()
+                self.ai.Place(self.game, p, self.game_settings.new_cells_per_round, self.rnd)
+                self.__showBoard()
+                continue
             added_cells = 0
-            while added_cells < self.game_settings.new_cells_per_round:
-                self.__setStatus('Round {}. Player {} adding cells: {} left'.format(self.game.cur_round, p, self.game_settings.new_cells_per_round - added_cells))
+            # 'u' takes back player's cells of this round
+            undo = self.game.Snapshot()
+            while added_cells < self.game_settings.new_cells_per_round and self.game_in_process:
+                left = self.game_settings.new_cells_per_round - added_cells
+                self.__setStatus('Round {}. Player {} adding {}: {} cells left'.format(
+                    self.game.cur_round, p, 'cells' if self.stamp is None else self.stamp.name, left))
                 for event in pygame.event.get():
-                    if event.type == MOUSEBUTTONDOWN:
-                        x = event.pos[0] // self.cell_size
-                        y = event.pos[1] // self.cell_size
-                        if self.game.AddCell(p, x, y):
-                            added_cells += 1
-                            pygame.draw.rect(self.screen,
-                                            self.__getCellColor(p),
-                                            (x*self.cell_size, y*self.cell_size, self.cell_size, self.cell_size))
+                    if event.type == QUIT:
+                        self.__appQuit()
+                    elif event.type == MOUSEBUTTONDOWN and event.button == 1:
+                        """ Cells can be added only where each pixel shows single cell """
+                        cell = self.viewport.CellAt(event.pos)
+                        if cell is None:
+                            continue
+                        if self.stamp is None:
+                            added = self.game.AddCell(p, *cell)
+                        else:
+                            added = self.game.AddPattern(p, self.stamp, cell[0], cell[1], left)
+                        if added:
+                            added_cells += added
+                            left -= added
+                            self.__showBoard()
+                    elif event.type == KEYDOWN and event.unicode and event.unicode in '0123456789r':
+                        self.__selectStamp(event.unicode)
+                    elif event.type == KEYDOWN and event.unicode == 'u':
+                        self.game.Restore(undo)
+                        added_cells = 0
+                        left = self.game_settings.new_cells_per_round
+                        self.__showBoard()
+                    else:
+                        self.__viewEvent(event)
                 self.__refreshFrame()
+        self.__timed('draw_lines', self.renderer.Reset, self.viewport, self.simulation.Capture(self.viewport), 'black')
+    
+    """ Key 0 = single cells, 1-9 = patterns of library, r = next rotation or reflection of pattern """
+    def __selectStamp(self, key: str):
+        names = list(patterns.PATTERNS)
+        if key == 'r':
+            if self.stamp is not None:
+                variants = patterns.PATTERNS[self.stamp.name].Variants()
+                self.stamp = variants[(variants.index(self.stamp) + 1) % len(variants)]
+        elif key == '0':
+            self.stamp = None
+        elif int(key) <= len(names):
+            self.stamp = patterns.PATTERNS[names[int(key) - 1]]
     
     """ Show current game status so that no one has to guess """
     def __setStatus(self, status):
-        self.menu.entryconfigure(4, label=status)
+        self.menu.entryconfigure(self.status_index, label=status)
     
     """ Refresh frame (tk and pygame) """
     def __refreshFrame(self):
-        pygame.display.flip()
+        self.__timed('display_update', self.renderer.Update)
         self.root.update_idletasks()
-        self.root.update()
-        self.clock.tick(self.speed)
\ No newline at end of file
+        self.__timed('tk_update', self.root.update)
+        self.clock.tick(self.fps)
+    
+    """ Call fn, timing it as given phase if profiling is on """
+    def __timed(self, phase: str, fn, *args):
+        if self.profiler is None:
+            return fn(*args)
+        started = time.perf_counter()
+        result = fn(*args)
+        self.profiler.Add(phase, time.perf_counter() - started, 0, self.game.cur_round)
+        return result
\ No newline at end of file
@@ -13,4 +13,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pygol.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from game.server import application as game_application
+
+
+async def application(scope, receive, send):
+    """ WebSocket connections go to game server, everything else to Django """
+    if scope['type'] == 'websocket':
+        await game_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)